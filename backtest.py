@@ -0,0 +1,143 @@
+# 관심 기업 목표가(target_buy / target_sell) 규칙 백테스트 (NumPy 벡터 연산, 종목 전체를 한 번에)
+#  - 카드의 신호와 같은 규칙: 종가 <= 매수 목표 → 매수, 종가 >= 매도 목표 → 매도 (그 사이는 이전 상태 유지)
+#  - 신호가 난 날 종가에 체결, 보유 중일 때만 다음 날부터 수익률 반영 (수수료/세금 미반영)
+#  - 목표가는 지금 설정된 값을 전 기간에 그대로 적용
+#  - 가격: price_history 로컬 저장소(네트워크 요청 없음) 또는 CSV(date, code, close)
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import price_history
+import user_store
+
+
+# {code: (dates, closes)} → (공통 날짜 축, 종목×날짜 종가 행렬) — 빠진 날은 직전 종가로 채움, 상장 전은 NaN
+def align(histories):
+    codes = list(histories)
+    if not codes:
+        return codes, np.zeros(0, dtype=np.int64), np.zeros((0, 0))
+    dates = np.unique(np.concatenate([histories[c][0] for c in codes]))
+    close = np.full((len(codes), dates.size), np.nan)
+    for i, code in enumerate(codes):
+        d, c = histories[code]
+        close[i, np.searchsorted(dates, d)] = c
+    close[close <= 0] = np.nan
+    return codes, dates, _ffill(close)
+
+
+# 행 방향 forward-fill (값이 있는 마지막 열 index를 누적 최대값으로 전파)
+def _ffill(values):
+    cols = np.arange(values.shape[1])
+    idx = np.where(~np.isnan(values), cols, 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    return values[np.arange(values.shape[0])[:, None], idx]
+
+
+# 종가 행렬 + 종목별 목표가 → 보유 여부 행렬(bool)
+def positions(close, target_buy, target_sell):
+    buy = close <= target_buy[:, None]
+    sell = close >= target_sell[:, None]
+    signal = np.where(buy, 1, np.where(sell, -1, 0))
+    # 마지막 신호를 앞으로 전파 (신호가 한 번도 없었으면 미보유)
+    cols = np.arange(close.shape[1])
+    last = np.where(signal != 0, cols, -1)
+    np.maximum.accumulate(last, axis=1, out=last)
+    held = np.take_along_axis(signal, np.maximum(last, 0), axis=1) == 1
+    return held & (last >= 0)
+
+
+def max_drawdown(equity):
+    peak = np.maximum.accumulate(equity, axis=-1)
+    return (equity / peak - 1).min(axis=-1)
+
+
+def run(histories, targets):
+    codes, dates, close = align({c: histories[c] for c in histories if c in targets})
+    if not codes:
+        return {"codes": [], "dates": dates, "per_code": [], "trades": [], "portfolio": None}
+    target_buy = np.array([targets[c][0] for c in codes], dtype=float)
+    target_sell = np.array([targets[c][1] for c in codes], dtype=float)
+    # 목표가가 없거나 매수 >= 매도인 종목은 신호 없음
+    invalid = (target_buy <= 0) | (target_sell <= 0) | (target_buy >= target_sell)
+    target_buy[invalid], target_sell[invalid] = -np.inf, np.inf
+
+    held = positions(close, target_buy, target_sell)   # NaN(상장 전)은 비교가 모두 False → 신호 없음
+    daily = np.zeros_like(close)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily[:, 1:] = np.nan_to_num(close[:, 1:] / close[:, :-1] - 1)
+    strategy = np.zeros_like(close)
+    strategy[:, 1:] = held[:, :-1] * daily[:, 1:]
+    equity = np.cumprod(1 + strategy, axis=1)
+    first = np.argmax(~np.isnan(close), axis=1)
+    buy_hold = close[:, -1] / close[np.arange(len(codes)), first] - 1
+
+    entries = held & ~np.concatenate([np.zeros((len(codes), 1), bool), held[:, :-1]], axis=1)
+    exits = ~held & np.concatenate([np.zeros((len(codes), 1), bool), held[:, :-1]], axis=1)
+    trades = []
+    per_code = []
+    for i, code in enumerate(codes):
+        opened, closed = np.flatnonzero(entries[i]), np.flatnonzero(exits[i])
+        code_trades = []
+        for k, e in enumerate(opened):
+            x = closed[k] if k < closed.size else None
+            exit_price = close[i, x] if x is not None else close[i, -1]
+            code_trades.append({"code": code, "entry_date": int(dates[e]), "entry_price": float(close[i, e]),
+                                "exit_date": int(dates[x]) if x is not None else None, "exit_price": float(exit_price),
+                                "return": float(exit_price / close[i, e] - 1), "open": x is None})
+        trades += code_trades
+        wins = sum(t["return"] > 0 for t in code_trades)
+        per_code.append({"code": code, "trades": len(code_trades),
+                         "win_rate": wins / len(code_trades) if code_trades else None,
+                         "return": float(equity[i, -1] - 1), "buy_hold": float(buy_hold[i]),
+                         "max_drawdown": float(max_drawdown(equity[i])), "exposure": float(held[i].mean())})
+
+    # 포트폴리오: 종목별 동일 비중 (매일 재조정), 가격이 있는 종목만 평균
+    alive = ~np.isnan(close)
+    portfolio_daily = (strategy * alive).sum(axis=0) / np.maximum(alive.sum(axis=0), 1)
+    portfolio_equity = np.cumprod(1 + portfolio_daily)
+    portfolio = {"return": float(portfolio_equity[-1] - 1), "max_drawdown": float(max_drawdown(portfolio_equity)),
+                 "days": int(dates.size), "start": int(dates[0]), "end": int(dates[-1])}
+    return {"codes": codes, "dates": dates, "per_code": per_code, "trades": trades,
+            "portfolio": portfolio, "equity": portfolio_equity}
+
+
+# ----- 입력 -----
+# 관심 기업 레코드 → {code: (target_buy, target_sell)}
+def watchlist_targets(user_data):
+    companies = [user_data.get("destiny_company") or {}] + list(user_data.get("interesting_companies") or [])
+    return {c["stock_code"]: (c.get("target_buy", 0), c.get("target_sell", 0))
+            for c in companies if c.get("stock_code")}
+
+def histories_from_store(codes):
+    histories = {}
+    for code in codes:
+        history, _ = price_history.load_history(code)
+        if history["date"].size:
+            histories[code] = (history["date"], history["close"])
+    return histories
+
+# CSV(date, code, close) → {code: (dates, closes)}, date는 YYYY-MM-DD 또는 YYYYMMDD
+def histories_from_csv(path_or_buffer):
+    df = pd.read_csv(path_or_buffer, dtype={"code": str}, usecols=["date", "code", "close"])
+    df["date"] = pd.to_datetime(df["date"].astype(str), format="mixed").dt.strftime("%Y%m%d").astype(np.int64)
+    df = df.sort_values(["code", "date"]).drop_duplicates(["code", "date"], keep="last")
+    return {code: (g["date"].to_numpy(), g["close"].to_numpy(dtype=float)) for code, g in df.groupby("code")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="관심 기업 목표가 규칙 백테스트")
+    parser.add_argument("username")
+    parser.add_argument("--csv", help="date,code,close 형식의 일봉 CSV (없으면 price_history 로컬 저장소 사용)")
+    args = parser.parse_args()
+    user_data = user_store.get_investment(args.username)
+    if not user_data:
+        raise SystemExit(f"관심 기업 데이터가 없습니다: {args.username}")
+    targets = watchlist_targets(user_data)
+    histories = histories_from_csv(args.csv) if args.csv else histories_from_store(targets)
+    result = run(histories, targets)
+    if not result["codes"]:
+        raise SystemExit("가격 이력이 있는 종목이 없습니다.")
+    print(pd.DataFrame(result["per_code"]).to_string(index=False))
+    p = result["portfolio"]
+    print(f"\n포트폴리오 {p['start']}~{p['end']} ({p['days']}일): 수익률 {p['return']:.2%}, 최대 낙폭 {p['max_drawdown']:.2%}")
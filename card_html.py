@@ -0,0 +1,87 @@
+# 기업/게시글/댓글 카드 HTML (내용이 같으면 다시 만들지 않고 캐시에서 꺼냄)
+# 캐시 키 = 카드에 들어가는 값 그대로 → 레코드 내용이 바뀌면 자동으로 새 HTML
+# main2.py는 rerun마다 다시 실행되므로 캐시는 이 모듈(프로세스당 1번 import)에 둠
+from functools import lru_cache
+
+
+def investment_signal(current_price, target_buy, target_sell):
+    if current_price > 0:
+        if current_price <= target_buy:
+            return "🟢 매수 신호", "#28a745"
+        elif current_price >= target_sell:
+            return "🔴 매도 신호", "#dc3545"
+        else:
+            return "🟡 관망", "#ffc107"
+    return "", "#333"
+
+
+# 가격 밴드 한 줄 (price_history.Bands)
+def _bands_line(bands):
+    if bands is None:
+        return ""
+    mas = " / ".join(f"{n}일선 {v:,}" for n, v in zip((20, 60, 120), (bands.ma20, bands.ma60, bands.ma120)) if v is not None)
+    return f"""<p><small>
+📏 52주 {bands.low_52w:,} ~ {bands.high_52w:,}원 · 1년 종가 백분위 {bands.position}%
+(10%/50%/90%: {bands.p10:,} / {bands.p50:,} / {bands.p90:,}원){"<br>" + mas if mas else ""}
+</small></p>
+"""
+
+@lru_cache(maxsize=2048)
+def _company_card(name, current_price, target_buy, target_sell, description, stale, bands):
+    signal, signal_color = investment_signal(current_price, target_buy, target_sell)
+    stale_text = '&nbsp;<small style="color:#6c757d;">(지연 시세)</small>' if stale else ""
+    return f"""<div class="company-card">
+<h4>🏢 {name}</h4>
+<p>
+<strong>현재가:</strong> {current_price:,}원{stale_text}
+&nbsp;&nbsp;
+<span style="color:{signal_color}; font-weight:bold;">{signal}</span>
+</p>
+<p>
+<span class="valuation-buy">매수 목표: {target_buy:,}원</span> |
+<span class="valuation-sell">매도 목표: {target_sell:,}원</span>
+</p>
+{_bands_line(bands)}<p><strong>특징:</strong> {description}</p>
+</div>
+"""
+
+def company_card(company, bands=None):
+    return _company_card(company['name'], company.get('current_price', 0), company.get('target_buy', 0),
+                         company.get('target_sell', 0), company.get('description', ''),
+                         bool(company.get('price_stale')), bands)
+
+# 여러 카드를 한 덩어리로 (st.markdown 1번으로 전송), bands = {종목코드: Bands}
+def company_cards(companies, bands=None):
+    bands = bands or {}
+    return "".join(company_card(c, bands.get(c.get('stock_code'))) for c in companies)
+
+
+@lru_cache(maxsize=4096)
+def _post_card(company, timestamp, author, content):
+    return f"""<div class="post-card">
+<div style="display:flex; justify-content:space-between; align-items:center;">
+<h5>🏢 {company}</h5>
+<small>📅 {timestamp} | 👤 {author}</small>
+</div>
+<p>{content}</p>
+</div>
+"""
+
+def post_card(post):
+    return _post_card(post['company'], post['timestamp'], post['author'], post['content'])
+
+
+@lru_cache(maxsize=8192)
+def _comment(author, timestamp, content):
+    return f"""<div style="background-color:#e9ecef; padding:8px; margin:5px 0; border-radius:5px;">
+<small><strong>{author}</strong> - {timestamp}</small><br>
+⤷ {content}
+</div>
+"""
+
+def comments(items):
+    return "".join(_comment(c['author'], c['timestamp'], c['content']) for c in items)
+
+
+def cache_info():
+    return {"company": _company_card.cache_info(), "post": _post_card.cache_info(), "comment": _comment.cache_info()}
@@ -0,0 +1,305 @@
+# 배치 작업용 명령줄 도구 (브라우저/Streamlit 없이 앱과 같은 데이터 파일을 사용, cron 등록용)
+#   python cli.py refresh            관심 종목 시세 일괄 갱신 → 사용자별 관심 기업 레코드에 반영
+#   python cli.py rebuild [대상]     인덱스 재계산 (stats: 사용자 통계, timeline: 타임라인, all)
+#   python cli.py compact            게시글 저널을 파일에 합치고 SQLite 정리
+#   python cli.py archive [--days N] N일보다 오래된 글을 월별 압축 보관 파일로 옮김
+#   python cli.py dedupe [--apply]   거의 같은 글 정리 (기본은 계획만 출력)
+#   python cli.py export --format csv|parquet|arrow [--out exports]
+#   python cli.py verify             데이터 무결성 검사
+# 종료 코드: 0 정상, 1 일부 실패/문제 발견, 2 잘못된 사용법
+# compact/archive/dedupe --apply는 게시글 파일을 다시 쓰므로 앱이 실행 중이면 거부함 (저장소 쓰기 잠금)
+# 나머지는 게시글 저장소를 읽기 전용으로 열어 앱이 실행 중이어도 됨
+import argparse
+import concurrent.futures
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+import columnar_export
+import near_dup
+import post_archive
+import post_store
+import quote_service
+import timeline
+import user_stats
+import user_store
+from post_store import from_epoch
+
+EXIT_OK, EXIT_FAILED = 0, 1
+
+_quiet = False
+
+
+def progress(message):
+    if not _quiet:
+        print(message, file=sys.stderr, flush=True)
+
+
+# ----- refresh -----
+def cmd_refresh(args):
+    records = dict(user_store.iter_investments()) if args.user is None else {args.user: user_store.get_investment(args.user)}
+    records = {u: r for u, r in records.items() if r}
+    if not records:
+        progress("갱신할 관심 기업이 없습니다.")
+        return EXIT_OK
+    codes = list(dict.fromkeys(c.get("stock_code") for r in records.values() for c in _companies(r) if c.get("stock_code")))
+    progress(f"사용자 {len(records)}명, 종목 {len(codes)}개 시세 조회 (동시 {quote_service.BATCH_WORKERS}개)")
+    started = time.monotonic()
+    futures = quote_service.prefetch(codes)
+    quotes, errors = {}, []
+    pending = {future: code for code, future in futures.items()}
+    for i, future in enumerate(concurrent.futures.as_completed(pending), start=1):
+        code = pending[future]
+        try:
+            quote = future.result()
+        except Exception as e:
+            quote = None
+            progress(f"  [{i}/{len(codes)}] {code} 실패: {e}")
+        if quote:
+            quotes[code] = quote
+            progress(f"  [{i}/{len(codes)}] {code} {quote['price']:,}원{' (지연)' if quote.get('stale') else ''}")
+        else:
+            errors.append(code)
+    # 시세를 받는 동안 사용자가 관심 기업을 수정했을 수 있으므로 저장할 때 최신 레코드를 다시 읽어 가격 필드만 바꿈
+    def apply(record):
+        updated = [c for c in _companies(record) if c.get("stock_code") in quotes]
+        for company in updated:
+            quote_service.apply_quote(company, quotes[company["stock_code"]])
+        return bool(updated)
+
+    for username in records:
+        user_store.update_investment(username, apply)
+    progress(f"완료: {len(quotes)}/{len(codes)}개 성공, {time.monotonic() - started:.1f}초")
+    if errors:
+        print(f"실패한 종목: {', '.join(errors)}", file=sys.stderr)
+        return EXIT_FAILED
+    return EXIT_OK
+
+def _companies(record):
+    return [record.get("destiny_company") or {}] + list(record.get("interesting_companies") or [])
+
+
+# ----- rebuild -----
+def cmd_rebuild(args):
+    store = post_store.PostStore(read_only=True)
+    try:
+        if args.target in ("stats", "all"):
+            progress("사용자 통계 재계산 중...")
+            stats = user_stats.UserStats()
+            stats.rebuild(store)
+            stats.save()
+            progress(f"  {len(stats)}명 → {user_stats.STATS_FILE}")
+        if args.target in ("timeline", "all"):
+            progress("타임라인 재구성 중...")
+            progress(f"  {timeline.rebuild(store)}명")
+    finally:
+        store.close(flush=False)
+    return EXIT_OK
+
+
+# ----- compact -----
+# 게시글 파일을 다시 쓰는 명령용: 앱 등 다른 프로세스가 쓰기용으로 열어 두었으면 None
+def _open_for_writing():
+    try:
+        return post_store.PostStore()
+    except post_store.StoreLocked:
+        print("앱(또는 다른 배치 작업)이 게시글 저장소를 사용 중입니다. 멈춘 뒤 다시 실행하세요.", file=sys.stderr)
+        return None
+
+
+def cmd_compact(args):
+    store = _open_for_writing()
+    if store is None:
+        return EXIT_FAILED
+    try:
+        journal = os.path.getsize(store.journal_path) if os.path.exists(store.journal_path) else 0
+        store.compact()
+        progress(f"게시글: 저널 {journal:,}바이트 반영 → {store.path} {os.path.getsize(store.path):,}바이트")
+    finally:
+        store.close()
+    before, after = user_store.compact()
+    progress(f"SQLite: {before:,} → {after:,}바이트")
+    return EXIT_OK
+
+
+# ----- archive -----
+def cmd_archive(args):
+    store = _open_for_writing()   # 앱이 실행 중이면 보관 파일도 쓰기 전에 거부
+    if store is None:
+        return EXIT_FAILED
+    try:
+        moved = post_archive.archive_posts(store, args.days)
+        remaining = len(store.table)
+    finally:
+        store.close()
+    for month, n in sorted(moved.items()):
+        progress(f"  {month}: {n}개 → {post_archive.segment_path(month)}")
+    progress(f"{sum(moved.values())}개 보관, 게시글 파일에 {remaining}개 남음 (기준 {args.days}일)")
+    if moved:
+        progress("사용자 통계는 다음 실행 때 보관 글을 포함해 다시 계산됩니다.")
+    return EXIT_OK
+
+
+# ----- dedupe -----
+def cmd_dedupe(args):
+    # 계획만 출력할 때는 읽기 전용 (앱이 실행 중이어도 됨), --apply는 앱이 실행 중이면 거부
+    store = _open_for_writing() if args.apply else post_store.PostStore(read_only=True)
+    if store is None:
+        return EXIT_FAILED
+    try:
+        progress(f"게시글 {len(store.table)}개 + 보관 글 중복 검사 (SimHash 해밍 거리 {near_dup.MAX_DISTANCE} 이하)")
+        plan = near_dup.dedupe(store, apply=args.apply)
+    finally:
+        store.close(flush=args.apply)
+    for original, merge, flag in plan:
+        print(f"원본 {original['id']} ({original['author']}, {original['timestamp']}{', 보관' if original.get('archived') else ''})")
+        for post in merge:
+            print(f"  합침 {post['id']} ({post['author']}, {post['timestamp']}) 좋아요 {post['likes']} 리트윗 {post['retweets']}")
+        for post in flag:
+            print(f"  표시 {post['id']} ({post['author']}, {post['timestamp']})")
+    n_merge, n_flag = sum(len(m) for _, m, _ in plan), sum(len(f) for _, _, f in plan)
+    if args.apply:
+        progress(f"{len(plan)}묶음: {n_merge}개 합침(삭제), {n_flag}개 duplicate_of 표시")
+        if n_merge:
+            progress("사용자 통계/타임라인은 python cli.py rebuild 로 다시 계산하세요.")
+    else:
+        progress(f"{len(plan)}묶음: 합칠 글 {n_merge}개, 표시할 글 {n_flag}개 (--apply로 적용)")
+    return EXIT_OK
+
+
+# ----- export -----
+def cmd_export(args):
+    store = post_store.PostStore(read_only=True)
+    try:
+        if args.format == "csv":
+            results = {
+                "posts": _write_csv(os.path.join(args.out, "posts.csv"), columnar_export.post_batches(store), "created_at"),
+                "comments": _write_csv(os.path.join(args.out, "comments.csv"), columnar_export.comment_batches(store), "created_at"),
+                "watchlists": _write_csv(os.path.join(args.out, "watchlists.csv"), columnar_export.watchlist_batches(), "last_updated"),
+            }
+        elif not columnar_export.available():
+            print("Parquet/Arrow 내보내기에는 pyarrow가 필요합니다 (pip install pyarrow)", file=sys.stderr)
+            return EXIT_FAILED
+        else:
+            results = columnar_export.export_all(store, args.out, "." + args.format)
+    finally:
+        store.close(flush=False)   # 읽기만 하므로 앱이 실행 중이어도 게시글 파일/저널을 건드리지 않음
+    for name, (path, rows) in results.items():
+        progress(f"{name}: {rows:,}행 → {path}")
+    return EXIT_OK
+
+# 배치 단위로 이어 쓰기 (엑셀 한글 깨짐 방지용 BOM 포함) → (경로, 행 수)
+def _write_csv(path, batches, time_field):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp, rows = path + ".tmp", 0
+    with open(tmp, 'w', encoding='utf-8-sig', newline='') as f:
+        for columns in batches:
+            columns[time_field] = [from_epoch(t) if t else "" for t in columns[time_field]]
+            pd.DataFrame(columns).to_csv(f, index=False, header=rows == 0)
+            rows += len(columns[time_field])
+    os.replace(tmp, path)
+    return path, rows
+
+
+# ----- verify -----
+STOCK_CODE = re.compile(r"^\d{6}$")
+
+def cmd_verify(args):
+    problems, warnings = [], []
+    store = post_store.PostStore(read_only=True)
+    try:
+        with store.lock:
+            table = store.table
+            rows = [(table.ids[i], table.author[i], table.ts[i], table.comment_count[i]) for i in range(len(table))]
+        progress(f"게시글 {len(rows)}개 검사")
+        ids = [r[0] for r in rows]
+        if len(set(map(str, ids))) != len(ids):
+            problems.append("중복된 게시글 id가 있습니다")
+        for post_id, author, ts, n_comments in rows:
+            if not author:
+                problems.append(f"게시글 {post_id}: 작성자 없음")
+            if not ts:
+                warnings.append(f"게시글 {post_id}: 작성 시각 형식이 다름")
+            actual = len(post_store.load_comments(post_id, limit=None))
+            if actual != n_comments:
+                problems.append(f"게시글 {post_id}: comment_count {n_comments} ≠ 댓글 파일 {actual}개")
+        if os.path.isdir(post_store.COMMENTS_DIR):
+            known = {os.path.basename(post_store.comments_path(post_id)) for post_id in ids + list(post_archive.archived_ids())}
+            for name in os.listdir(post_store.COMMENTS_DIR):
+                if name.endswith(".jsonl") and name not in known:
+                    problems.append(f"댓글 파일 {name}: 해당 게시글 없음")
+
+        stats = user_stats.UserStats()
+        if stats.load() and stats.fingerprint != user_stats.store_fingerprint(table):
+            warnings.append("사용자 통계 스냅샷이 현재 게시글과 다름 (python cli.py rebuild stats)")
+    finally:
+        store.close(flush=False)   # 검사만 하고 파일/저널은 그대로
+
+    users = {u for u, _ in user_store.iter_users()}
+    progress(f"사용자 {len(users)}명 관심 기업 검사")
+    for username, record in user_store.iter_investments():
+        if username not in users:
+            problems.append(f"관심 기업 {username}: 계정 없음")
+        if "destiny_company" not in record or "interesting_companies" not in record:
+            problems.append(f"관심 기업 {username}: 필수 항목 없음")
+            continue
+        for company in _companies(record):
+            code = company.get("stock_code")
+            if code and not STOCK_CODE.match(code):
+                problems.append(f"관심 기업 {username}/{company.get('name')}: 종목 코드 형식 오류 ({code})")
+
+    result = user_store.integrity_check()
+    if result != ["ok"]:
+        problems += [f"SQLite: {line}" for line in result]
+
+    for line in warnings:
+        print(f"경고: {line}")
+    for line in problems:
+        print(f"문제: {line}")
+    print(f"검사 완료: 문제 {len(problems)}건, 경고 {len(warnings)}건")
+    return EXIT_FAILED if problems else EXIT_OK
+
+
+def main(argv=None):
+    global _quiet
+    parser = argparse.ArgumentParser(description="가치주 분석 커뮤니티 배치 작업")
+    parser.add_argument("-q", "--quiet", action="store_true", help="진행 상황 출력 안 함")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("refresh", help="관심 종목 시세 일괄 갱신")
+    p.add_argument("--user", help="이 사용자만 갱신")
+    p.set_defaults(func=cmd_refresh)
+
+    p = sub.add_parser("rebuild", help="인덱스 재계산")
+    p.add_argument("target", nargs="?", choices=["stats", "timeline", "all"], default="all")
+    p.set_defaults(func=cmd_rebuild)
+
+    p = sub.add_parser("compact", help="게시글 저널 반영 + SQLite 정리")
+    p.set_defaults(func=cmd_compact)
+
+    p = sub.add_parser("archive", help="오래된 글을 월별 압축 보관 파일로 옮김")
+    p.add_argument("--days", type=int, default=post_archive.HOT_DAYS, help="게시글 파일에 남길 기간(일)")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("dedupe", help="거의 같은 글 정리")
+    p.add_argument("--apply", action="store_true", help="계획만 출력하지 않고 실제로 합치기/표시")
+    p.set_defaults(func=cmd_dedupe)
+
+    p = sub.add_parser("export", help="게시글/댓글/관심 기업 내보내기")
+    p.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv")
+    p.add_argument("--out", default=columnar_export.EXPORT_DIR, help="출력 디렉터리")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("verify", help="데이터 무결성 검사")
+    p.set_defaults(func=cmd_verify)
+
+    args = parser.parse_args(argv)
+    _quiet = args.quiet
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+# 게시글/댓글/관심 기업을 컬럼 형식(Parquet 또는 Arrow IPC)으로 내보내기 (노트북 분석용)
+#  - 시각은 timestamp, 카운터는 정수, 기업/작성자처럼 반복되는 문자열은 dictionary 인코딩
+#  - BATCH_ROWS개씩 record batch로 나눠 쓰므로 내보내는 양과 무관하게 메모리 사용량이 일정
+#  - 파일 형식은 확장자로 결정: .parquet → Parquet(zstd), .arrow / .feather → Arrow IPC
+#  - *_batches() 생성기는 CSV 내보내기(cli.py)에서도 같은 컬럼으로 재사용
+# pyarrow는 선택 의존성 (없으면 CSV 내보내기만 사용 가능)
+import argparse
+import io
+import os
+from itertools import islice
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+import post_archive
+import post_store
+import user_store
+from post_store import to_epoch
+
+BATCH_ROWS = 10_000
+EXPORT_DIR = "exports"
+
+
+def available():
+    return pa is not None
+
+
+def _require():
+    if pa is None:
+        raise RuntimeError("컬럼 형식 내보내기에는 pyarrow가 필요합니다 (pip install pyarrow)")
+
+
+def _dict_string():
+    return pa.dictionary(pa.int32(), pa.string())
+
+def _timestamp():
+    return pa.timestamp("s", tz="UTC")   # epoch 초 그대로 (표시할 때 Asia/Seoul로 변환)
+
+
+def posts_schema():
+    return pa.schema([
+        ("id", pa.string()),
+        ("company", _dict_string()),
+        ("author", _dict_string()),
+        ("content", pa.string()),
+        ("created_at", _timestamp()),
+        ("is_public", pa.bool_()),
+        ("likes", pa.int32()),
+        ("retweets", pa.int32()),
+        ("comment_count", pa.int32()),
+    ])
+
+def comments_schema():
+    return pa.schema([
+        ("post_id", pa.string()),
+        ("company", _dict_string()),
+        ("author", _dict_string()),
+        ("content", pa.string()),
+        ("created_at", _timestamp()),
+    ])
+
+def watchlists_schema():
+    return pa.schema([
+        ("username", _dict_string()),
+        ("slot", _dict_string()),          # "destiny" | "interesting"
+        ("position", pa.int32()),          # 관심 기업 목록 안의 순서 (destiny는 0)
+        ("name", _dict_string()),
+        ("stock_code", _dict_string()),
+        ("current_price", pa.int64()),
+        ("target_buy", pa.int64()),
+        ("target_sell", pa.int64()),
+        ("description", pa.string()),
+        ("last_updated", _timestamp()),
+    ])
+
+
+def _fmt(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        return "parquet"
+    if ext in (".arrow", ".feather"):
+        return "arrow"
+    raise ValueError(f"지원하지 않는 확장자입니다: {path} (.parquet / .arrow)")
+
+
+# dictionary 컬럼은 파일 전체에서 사전 1개를 이어서 키움 (배치마다 새 사전을 만들면 Arrow IPC 파일이 거부)
+# → 새 값만 사전 뒤에 붙고, IPC 파일에는 늘어난 부분만 delta로 기록
+class _Dictionary:
+    def __init__(self, field):
+        self.type = field.type
+        self.values = []
+        self._index = {}
+
+    def encode(self, column):
+        indices = []
+        for value in column:
+            if value is None:
+                indices.append(None)
+                continue
+            i = self._index.get(value)
+            if i is None:
+                i = self._index[value] = len(self.values)
+                self.values.append(value)
+            indices.append(i)
+        return pa.DictionaryArray.from_arrays(pa.array(indices, type=self.type.index_type),
+                                              pa.array(self.values, type=self.type.value_type))
+
+
+# 컬럼 dict 배치들을 sink(파일 경로 또는 버퍼)에 순서대로 기록 → 기록한 행 수
+def _write(sink, schema, batches, fmt):
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+    dictionaries = {f.name: _Dictionary(f) for f in schema if pa.types.is_dictionary(f.type)}
+    rows = 0
+    try:
+        for columns in batches:
+            arrays = [dictionaries[f.name].encode(columns[f.name]) if f.name in dictionaries
+                      else pa.array(columns[f.name], type=f.type) for f in schema]
+            batch = pa.record_batch(arrays, schema=schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        writer.close()
+    return rows
+
+# 파일은 임시 파일에 다 쓴 뒤 교체 (중간에 실패해도 이전 내보내기 파일 유지)
+def _write_file(path, schema, batches):
+    _require()
+    fmt = _fmt(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    rows = _write(tmp, schema, batches, fmt)
+    os.replace(tmp, path)
+    return rows
+
+
+def _epoch(text):
+    return to_epoch(text) if text else None
+
+
+# ----- 게시글 (최근 글 + 보관된 글) -----
+def post_batches(store):
+    start = 0
+    while True:
+        # 저장소 lock은 배치 하나를 복사하는 동안만 잡음
+        with store.lock:
+            table = store.table
+            end = min(start + BATCH_ROWS, len(table))
+            if start >= end:
+                break
+            columns = {
+                "id": [str(i) for i in table.ids[start:end]],
+                "company": table.company[start:end],
+                "author": table.author[start:end],
+                "content": table.content[start:end],
+                "created_at": [t or None for t in table.ts[start:end]],
+                "is_public": [bool(v) for v in table.is_public[start:end]],
+                "likes": table.likes[start:end].tolist(),
+                "retweets": table.retweets[start:end].tolist(),
+                "comment_count": table.comment_count[start:end].tolist(),
+            }
+        yield columns
+        start = end
+    archived = post_archive.iter_archived()
+    while chunk := list(islice(archived, BATCH_ROWS)):
+        yield from post_dict_batches(chunk)
+
+# dict 리스트(화면에 보이는 목록 등) → 같은 스키마의 배치
+def post_dict_batches(posts):
+    for start in range(0, len(posts), BATCH_ROWS):
+        chunk = posts[start:start + BATCH_ROWS]
+        yield {
+            "id": [str(p['id']) for p in chunk],
+            "company": [p.get('company', '') for p in chunk],
+            "author": [p.get('author', '') for p in chunk],
+            "content": [p.get('content', '') for p in chunk],
+            "created_at": [_epoch(p.get('timestamp')) for p in chunk],
+            "is_public": [bool(p.get('is_public', True)) for p in chunk],
+            "likes": [int(p.get('likes', 0) or 0) for p in chunk],
+            "retweets": [int(p.get('retweets', 0) or 0) for p in chunk],
+            "comment_count": [int(post_store.comment_count(p) or 0) for p in chunk],
+        }
+
+def export_posts(store, path):
+    return _write_file(path, posts_schema(), post_batches(store))
+
+# 다운로드 버튼용: 게시글 dict 리스트 → Parquet 바이트
+def posts_parquet_bytes(posts):
+    _require()
+    buf = io.BytesIO()
+    _write(buf, posts_schema(), post_dict_batches(posts), "parquet")
+    return buf.getvalue()
+
+
+# ----- 댓글 (게시글별 파일을 하나씩 읽어 배치로 모음) -----
+def comment_batches(store):
+    with store.lock:
+        table = store.table
+        posts = [(table.ids[i], table.company[i]) for i in range(len(table)) if table.comment_count[i]]
+    posts += [(p['id'], p.get('company', '')) for p in post_archive.iter_archived() if p.get('comment_count')]
+    columns = {name: [] for name in ("post_id", "company", "author", "content", "created_at")}
+    for post_id, company in posts:
+        for c in post_store.load_comments(post_id, limit=None):
+            columns["post_id"].append(str(post_id))
+            columns["company"].append(company)
+            columns["author"].append(c.get('author', ''))
+            columns["content"].append(c.get('content', ''))
+            columns["created_at"].append(_epoch(c.get('timestamp')))
+        if len(columns["post_id"]) >= BATCH_ROWS:
+            yield columns
+            columns = {name: [] for name in columns}
+    if columns["post_id"]:
+        yield columns
+
+def export_comments(store, path):
+    return _write_file(path, comments_schema(), comment_batches(store))
+
+
+# ----- 관심 기업 (사용자별 레코드를 하나씩 읽어 행으로 펼침) -----
+def watchlist_batches():
+    columns = {name: [] for name in ("username", "slot", "position", "name", "stock_code", "current_price",
+                                     "target_buy", "target_sell", "description", "last_updated")}
+    for username, data in user_store.iter_investments():
+        slots = [("destiny", 0, data.get("destiny_company") or {})]
+        slots += [("interesting", i, c) for i, c in enumerate(data.get("interesting_companies") or [], start=1)]
+        for slot, position, company in slots:
+            if not company.get("name"):
+                continue
+            columns["username"].append(username)
+            columns["slot"].append(slot)
+            columns["position"].append(position)
+            columns["name"].append(company["name"])
+            columns["stock_code"].append(company.get("stock_code", ""))
+            for field in ("current_price", "target_buy", "target_sell"):
+                columns[field].append(int(company.get(field, 0) or 0))
+            columns["description"].append(company.get("description", ""))
+            columns["last_updated"].append(_epoch(company.get("last_updated")))
+        if len(columns["username"]) >= BATCH_ROWS:
+            yield columns
+            columns = {name: [] for name in columns}
+    if columns["username"]:
+        yield columns
+
+def export_watchlists(path):
+    return _write_file(path, watchlists_schema(), watchlist_batches())
+
+
+# 세 가지를 한 디렉터리에 → {이름: (경로, 행 수)}
+def export_all(store, out_dir=EXPORT_DIR, ext=".parquet"):
+    results = {}
+    for name, export in (("posts", lambda p: export_posts(store, p)),
+                         ("comments", lambda p: export_comments(store, p)),
+                         ("watchlists", export_watchlists)):
+        path = os.path.join(out_dir, name + ext)
+        results[name] = (path, export(path))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="게시글/댓글/관심 기업 컬럼 형식 내보내기")
+    parser.add_argument("--out", default=EXPORT_DIR, help="출력 디렉터리")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    args = parser.parse_args()
+    store = post_store.PostStore(read_only=True)
+    try:
+        for name, (path, rows) in export_all(store, args.out, "." + args.format).items():
+            print(f"{name}: {rows}행 → {path}")
+    finally:
+        store.close(flush=False)
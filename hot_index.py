@@ -0,0 +1,108 @@
+# "인기순" 피드 랭킹 (게시글 저장소 변경 시 해당 글의 점수만 증분 갱신)
+#  - 점수 = log10(반응 가중합) + 작성시각 / HOT_TAU
+#    → 시간이 지나도 기존 점수를 다시 계산할 필요 없음 (새 글이 HOT_TAU초 늦을수록 반응 10배와 같은 가치)
+#  - 전체/기업별로 점수순 정렬 리스트를 유지해 상위 N개를 이분 탐색 + 슬라이스로 바로 꺼냄
+import math
+import threading
+from bisect import bisect_left, insort
+
+from post_store import to_epoch
+
+HOT_TAU = 45000   # 초 (12.5시간)
+# 반응 가중치
+HOT_WEIGHTS = {"likes": 1, "retweets": 2, "comment_count": 1}
+
+
+def hot_score(post, ts):
+    engagement = sum(int(post.get(field, 0) or 0) * w for field, w in HOT_WEIGHTS.items())
+    return math.log10(max(engagement, 1)) + ts / HOT_TAU
+
+
+class HotIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = {}        # str(post id) -> (정렬 키, 기업)
+        self._ids = {}         # str(post id) -> 원래 id (예전 글은 int id도 있어 정렬 키에는 문자열로 넣음)
+        self._ts = {}          # post id -> 작성 시각(epoch)
+        self._all = []         # (-score, -ts, id) 오름차순 = 점수 내림차순
+        self._by_company = {}  # 기업 -> 같은 형식의 정렬 리스트
+
+    def __len__(self):
+        return len(self._keys)
+
+    # 저장소 이벤트 구독용 (댓글은 comment_count "increment"로 함께 들어옴)
+    def __call__(self, event, post, **details):
+        if event == "post":
+            self._update(post, to_epoch(post.get('timestamp')) or 0)
+        elif event == "increment":
+            self._update(post)
+        elif event == "remove":
+            self._discard(post['id'])
+
+    def _update(self, post, ts=None):
+        post_id = str(post['id'])
+        with self._lock:
+            if ts is None:
+                ts = self._ts.get(post_id, 0)
+            self._ts[post_id] = ts
+            self._ids[post_id] = post['id']
+            old = self._keys.pop(post_id, None)
+            if old is not None:
+                self._remove(self._all, old[0])
+                self._remove(self._by_company.get(old[1], []), old[0])
+            key = (-hot_score(post, ts), -ts, post_id)
+            company = post.get('company') or ''
+            self._keys[post_id] = (key, company)
+            insort(self._all, key)
+            insort(self._by_company.setdefault(company, []), key)
+
+    def _discard(self, post_id):
+        post_id = str(post_id)
+        with self._lock:
+            old = self._keys.pop(post_id, None)
+            self._ts.pop(post_id, None)
+            self._ids.pop(post_id, None)
+            if old is not None:
+                self._remove(self._all, old[0])
+                self._remove(self._by_company.get(old[1], []), old[0])
+
+    @staticmethod
+    def _remove(board, key):
+        i = bisect_left(board, key)
+        if i < len(board) and board[i] == key:
+            board.pop(i)
+
+    # 상위 n개 게시글 id (company를 주면 그 기업 글 중에서)
+    def top(self, n=20, company=None):
+        with self._lock:
+            board = self._all if company is None else self._by_company.get(company, [])
+            return [self._ids[post_id] for _, _, post_id in board[:n]]
+
+    # 전체 게시글로 처음부터 다시 계산 (저장소 메모리만 읽으므로 파일 I/O 없음)
+    def rebuild(self, store):
+        keys, stamps, ids, by_company = {}, {}, {}, {}
+        with store.lock:
+            table = store.table
+            for i in range(len(table)):
+                post_id, ts = str(table.ids[i]), table.ts[i]
+                post = {"likes": table.likes[i], "retweets": table.retweets[i], "comment_count": table.comment_count[i]}
+                key = (-hot_score(post, ts), -ts, post_id)
+                keys[post_id] = (key, table.company[i])
+                stamps[post_id] = ts
+                ids[post_id] = table.ids[i]
+                by_company.setdefault(table.company[i], []).append(key)
+        # 한 번에 정렬 (글마다 insort하지 않음)
+        for board in by_company.values():
+            board.sort()
+        with self._lock:
+            self._keys, self._ts, self._ids, self._by_company = keys, stamps, ids, by_company
+            self._all = sorted(key for key, _ in keys.values())
+
+
+# 저장소에 연결: 현재 게시글로 한 번 계산한 뒤 변경을 구독
+def attach(store):
+    index = HotIndex()
+    with store.lock:
+        index.rebuild(store)
+        store.subscribe(index)
+    return index
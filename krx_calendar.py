@@ -0,0 +1,89 @@
+# KRX 거래 캘린더 + 시세 캐시 TTL 정책
+# 휴장일/개장 시각 변경일은 krx_calendar.json에서 관리 (매년 KRX 공지를 보고 추가)
+#  - 장중: 짧은 TTL (QUOTE_SESSION_TTL초)
+#  - 장 마감 후/주말/휴장일/개장 전: 다음 개장 시각까지 종가를 그대로 사용
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+CALENDAR_FILE = "krx_calendar.json"
+KST = timezone(timedelta(hours=9))   # 한국은 서머타임이 없어 고정 오프셋으로 충분
+SESSION_TTL = int(os.environ.get("QUOTE_SESSION_TTL", "30"))   # 장중 캐시(초)
+CLOSE_GRACE = timedelta(minutes=5)   # 마감 직후 종가가 반영될 때까지는 장중 TTL 유지
+
+_calendar = None
+
+
+def load_calendar(path=CALENDAR_FILE):
+    global _calendar
+    if _calendar is None:
+        data = {"session": {"open": "09:00", "close": "15:30"}, "holidays": [], "special_sessions": {}}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data.update(json.load(f))
+        data["holidays"] = set(data["holidays"])
+        _calendar = data
+    return _calendar
+
+
+def _at(day, hhmm):
+    hour, minute = map(int, hhmm.split(":"))
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=KST)
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day.isoformat() not in load_calendar()["holidays"]
+
+
+# 해당 날짜의 (개장, 마감) 시각, 휴장일이면 None
+def session_bounds(day):
+    if not is_trading_day(day):
+        return None
+    calendar = load_calendar()
+    session = calendar["special_sessions"].get(day.isoformat(), calendar["session"])
+    return _at(day, session["open"]), _at(day, session["close"])
+
+
+def now_kst():
+    return datetime.now(KST)
+
+
+def is_market_open(now=None):
+    now = now or now_kst()
+    bounds = session_bounds(now.date())
+    return bool(bounds) and bounds[0] <= now < bounds[1]
+
+
+# now 이후 가장 가까운 개장 시각
+def next_open(now=None):
+    now = now or now_kst()
+    day = now.date()
+    for _ in range(30):
+        bounds = session_bounds(day)
+        if bounds and bounds[0] > now:
+            return bounds[0]
+        day += timedelta(days=1)
+    return now + timedelta(days=1)   # 캘린더가 비정상이면 하루 뒤 재확인
+
+
+# now 기준으로 장이 끝나 일봉이 확정된 가장 최근 거래일 (일봉 캐시의 기준 날짜)
+def last_closed_day(now=None):
+    now = now or now_kst()
+    day = now.date()
+    bounds = session_bounds(day)
+    if bounds and bounds[1] + CLOSE_GRACE <= now:
+        return day
+    for _ in range(30):
+        day -= timedelta(days=1)
+        if is_trading_day(day):
+            return day
+    return day
+
+
+# 지금 받은 시세를 몇 초 동안 재사용해도 되는지 (시세 캐시와 백그라운드 갱신이 함께 사용)
+def quote_ttl(now=None):
+    now = now or now_kst()
+    bounds = session_bounds(now.date())
+    if bounds and bounds[0] <= now < bounds[1] + CLOSE_GRACE:
+        return SESSION_TTL
+    return max(SESSION_TTL, (next_open(now) - now).total_seconds())
@@ -1,14 +1,28 @@
 import streamlit as st
 import pandas as pd
-import json
+import concurrent.futures
 import hashlib
 from datetime import datetime
 import os
 import requests
-from bs4 import BeautifulSoup
 import time
 import uuid
 
+import backtest
+import card_html
+import columnar_export
+import hot_index
+import near_dup
+import popularity
+import post_archive
+import post_store
+import price_history
+import profiling
+import quote_service
+import timeline
+import user_stats
+import user_store
+
 # 페이지 설정
 st.set_page_config(
     page_title="가치주 분석 커뮤니티 v2",
@@ -67,76 +81,18 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # 데이터 파일 경로 (v2용으로 분리)
-DATA_FILE = "investment_data_v2.json"
-POSTS_FILE = "posts_data_v2.json"
-USERS_FILE = "users_data_v2.json"
+DATA_FILE = user_store.DATA_FILE
+POSTS_FILE = post_store.POSTS_FILE
+USERS_FILE = user_store.USERS_FILE
 
-# 네이버 증권 주가 크롤링 함수
-@st.cache_data(ttl=300)  # 5분 캐시
+# 네이버 증권 주가 조회 (quote_service: 종목당 1건만 요청 + 만료 시 옛 값 즉시 반환)
+# 네이버 장애 시 서킷 브레이커가 열려 즉시 실패 → 마지막 시세(stale) 또는 저장된 값 유지
 def get_stock_price(stock_code):
     try:
-        url = f"https://finance.naver.com/item/main.nhn?code={stock_code}"
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        current_price = None
-        price_element = soup.select_one('.no_today .blind')
-        if price_element:
-            price_text = price_element.text.strip()
-            price_numbers = ''.join(c for c in price_text if c.isdigit() or c == ',')
-            if price_numbers:
-                current_price = int(price_numbers.replace(',', ''))
-        if current_price is None:
-            blind_elements = soup.select('.blind')
-            for element in blind_elements:
-                text = element.text.strip()
-                numbers_only = ''.join(c for c in text if c.isdigit() or c == ',')
-                if numbers_only and len(numbers_only) >= 3:
-                    try:
-                        current_price = int(numbers_only.replace(',', ''))
-                        break
-                    except:
-                        continue
-        if current_price is None:
-            return None
-
-        change = 0
-        change_rate = 0.0
-        blind_elements = soup.select('.blind')
-        for i, element in enumerate(blind_elements):
-            text = element.text.strip()
-            if i > 0 and i < len(blind_elements) - 1:
-                numbers_only = ''.join(c for c in text if c.isdigit() or c == ',')
-                if numbers_only and len(numbers_only) <= 6:
-                    try:
-                        change_value = int(numbers_only.replace(',', ''))
-                        if change_value > 0 and change_value < current_price:
-                            change = change_value
-                            parent_text = str(element.parent) if element.parent else ""
-                            if 'minus' in parent_text or 'down' in parent_text.lower():
-                                change = -change
-                            break
-                    except:
-                        continue
-        for element in blind_elements:
-            text = element.text.strip()
-            if '%' in text:
-                try:
-                    rate_text = text.replace('%', '').replace('+', '').replace('-', '').strip()
-                    change_rate = float(rate_text)
-                    change_rate = -abs(change_rate) if change < 0 else abs(change_rate)
-                    break
-                except:
-                    continue
-
-        return {
-            'price': current_price,
-            'change': change,
-            'change_rate': change_rate,
-            'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        return quote_service.get_quote(stock_code)
+    except quote_service.UpstreamUnavailable:
+        st.warning("시세 서버 응답이 없어 잠시 조회를 멈췄습니다. 마지막으로 저장된 가격을 표시합니다.")
+        return None
     except requests.exceptions.RequestException:
         st.error("네트워크 오류: 인터넷 연결을 확인해주세요.")
         return None
@@ -144,52 +100,81 @@ def get_stock_price(stock_code):
         st.error(f"주가 정보를 가져올 수 없습니다. 주식 코드를 확인해주세요. (코드: {stock_code})")
         return None
 
+# 여러 종목 일괄 조회 (동시 요청, 실패한 종목은 경고 1번으로 모아서 표시)
+def get_stock_prices(stock_codes):
+    quotes, errors = quote_service.get_quotes(stock_codes)
+    if errors:
+        st.warning(f"{len(errors)}개 종목의 주가를 가져오지 못했습니다: {', '.join(errors)}")
+    return quotes
+
 # 비밀번호 관련
 def hash_password(password): return hashlib.sha256(password.encode()).hexdigest()
 def verify_password(password, hashed_password): return hash_password(password) == hashed_password
 
-# 사용자/데이터 로드/저장
-def load_users():
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r', encoding='utf-8') as f: return json.load(f)
-    return {}
-def save_users(users):
-    with open(USERS_FILE, 'w', encoding='utf-8') as f: json.dump(users, f, ensure_ascii=False, indent=2)
-
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r', encoding='utf-8') as f: return json.load(f)
-    return {}
-def save_data(data):
-    with open(DATA_FILE, 'w', encoding='utf-8') as f: json.dump(data, f, ensure_ascii=False, indent=2)
-
-# 추가: 기존 파일과 병합 저장
+# 사용자/데이터 로드/저장 (user_store: 사용자별 레코드 단위로 SQLite에 저장)
+def load_user(username): return user_store.get_user(username)
+def load_user_data(username): return user_store.get_investment(username)
+
+# 추가: 해당 사용자 레코드만 저장 (다른 사용자 데이터는 읽지도 쓰지도 않음)
 def save_data_merge(user_key, user_data):
-    data_now = load_data()
-    data_now[user_key] = user_data
-    save_data(data_now)
-
-def load_posts():
-    if os.path.exists(POSTS_FILE):
-        with open(POSTS_FILE, 'r', encoding='utf-8') as f: return json.load(f)
-    return []
-def save_posts(posts):
-    with open(POSTS_FILE, 'w', encoding='utf-8') as f: json.dump(posts, f, ensure_ascii=False, indent=2)
-
-# 초기 데이터 구조
+    user_store.put_investment(user_key, user_data)
+
+# 게시글 (댓글은 post_store의 별도 댓글 저장소, 게시글에는 comment_count만)
+# 변경은 메모리에 즉시 반영되고 파일 저장은 백그라운드 writer가 모아서 처리
+# 피드는 전체를 dict로 바꾸지 않고 화면에 보일 글만 저장소에서 꺼냄 (store.latest / store.get)
+
+# 게시글 저장소 + 변경을 구독하는 인덱스들 (프로세스당 1회 연결)
+@st.cache_resource
+def get_post_store():
+    store = post_store.get_store()
+    user_stats_index(store)
+    hot_feed_index(store)
+    timeline_fanout(store)
+    near_dup_index(store)
+    popularity_index(store)
+    return store
+
+@st.cache_resource
+def user_stats_index(_store):
+    return user_stats.attach(_store)
+
+@st.cache_resource
+def hot_feed_index(_store):
+    return hot_index.attach(_store)
+
+@st.cache_resource
+def timeline_fanout(_store):
+    return timeline.attach(_store)
+
+@st.cache_resource
+def near_dup_index(_store):
+    return near_dup.attach(_store)
+
+@st.cache_resource
+def popularity_index(_store):
+    return popularity.attach(_store)
+
+# 초기 데이터 구조 (관심 기업은 개수 제한 없는 리스트)
+def new_company(**fields):
+    company = {"name": "", "stock_code": "", "current_price": 0,
+               "target_buy": 0, "target_sell": 0, "description": "", "last_updated": ""}
+    company.update(fields)
+    return company
+
 def initialize_user_data(username):
     return {
         "username": username,
-        "destiny_company": {
-            "name": "", "stock_code": "", "current_price": 0,
-            "target_buy": 0, "target_sell": 0, "description": "", "last_updated": ""
-        },
-        "interesting_companies": [
-            {"name": "", "stock_code": "", "current_price": 0,
-             "target_buy": 0, "target_sell": 0, "description": "", "last_updated": ""} for _ in range(5)
-        ]
+        "destiny_company": new_company(),
+        "interesting_companies": []
     }
 
+# 예전 형식(빈 칸 5개 고정)에서 비어 있는 칸 제거
+def normalize_user_data(user_data):
+    user_data["interesting_companies"] = [
+        c for c in user_data.get("interesting_companies", []) if c.get("name") or c.get("stock_code")
+    ]
+    return user_data
+
 # 세션 상태
 ss = st.session_state
 ss.setdefault("logged_in_v2", False)
@@ -199,6 +184,9 @@ ss.setdefault("username_v2", "")
 ss.setdefault("active_tab_v2", "📊 내 관심 기업")
 ss.setdefault("selected_company_v2", "")
 ss.setdefault("show_research_form_v2", False)
+ss.setdefault("watchlist_rev_v2", 0)
+ss.setdefault("archive_months_v2", 0)   # 피드에 불러온 보관 글 개월 수
+ss.setdefault("auto_refresh_v2", False)  # 카드 자동 갱신 모드
 
 # 인증 화면
 def auth_page():
@@ -212,23 +200,23 @@ def auth_page():
 
 def login_form():
     st.markdown("### 로그인")
-    users = load_users()
     with st.form("login_form_v2"):
         username = st.text_input("사용자명", placeholder="사용자명을 입력하세요")
         password = st.text_input("비밀번호", type="password", placeholder="비밀번호를 입력하세요")
         login_button = st.form_submit_button("로그인", use_container_width=True)
         if login_button:
-            if username in users and verify_password(password, users[username]['password']):
+            user = load_user(username)
+            if user and verify_password(password, user['password']):
                 ss.logged_in_v2 = True; ss.username_v2 = username
+                prefetch_user_quotes(username)   # 대시보드가 뜨는 동안 시세를 미리 받아둠
                 st.success("로그인 성공!"); time.sleep(1); st.rerun()
-            elif username not in users:
+            elif user is None:
                 st.error("존재하지 않는 사용자명입니다.")
             else:
                 st.error("비밀번호가 올바르지 않습니다.")
 
 def signup_form():
     st.markdown("### 회원가입")
-    users = load_users()
     with st.form("signup_form_v2"):
         username = st.text_input("사용자명", placeholder="원하는 사용자명을 입력하세요")
         password = st.text_input("비밀번호", type="password", placeholder="비밀번호를 입력하세요")
@@ -239,23 +227,23 @@ def signup_form():
             if not username: st.error("사용자명을 입력해주세요.")
             elif not password: st.error("비밀번호를 입력해주세요.")
             elif password != password_confirm: st.error("비밀번호가 일치하지 않습니다.")
-            elif username in users: st.error("이미 존재하는 사용자명입니다.")
+            elif load_user(username) is not None: st.error("이미 존재하는 사용자명입니다.")
             elif len(password) < 4: st.error("비밀번호는 최소 4자 이상이어야 합니다.")
             else:
-                users[username] = {
+                created = user_store.create_user(username, {
                     'password': hash_password(password),
                     'email': email,
                     'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                save_users(users)
-                st.success("회원가입 완료! 로그인 탭에서 로그인해주세요.")
+                })
+                if created: st.success("회원가입 완료! 로그인 탭에서 로그인해주세요.")
+                else: st.error("이미 존재하는 사용자명입니다.")
 
 # ----- 버튼형 탭 네비게이션 -----
-TABS = ["📊 내 관심 기업", "📝 리서치 게시글", "⚙️ 기업 정보 수정"]
+TABS = ["📊 내 관심 기업", "📝 리서치 게시글", "📈 커뮤니티 통계", "⚙️ 기업 정보 수정"]
 def render_navbar_v2():
     st.markdown('<div class="tab-row"></div>', unsafe_allow_html=True)
-    c1, c2, c3 = st.columns(3, gap="small")
-    for i, (col, name) in enumerate(zip([c1, c2, c3], TABS)):
+    cols = st.columns(len(TABS), gap="small")
+    for i, (col, name) in enumerate(zip(cols, TABS)):
         with col:
             klass = "tabbtn active" if ss.active_tab_v2 == name else "tabbtn"
             st.markdown(f'<div class="{klass}">', unsafe_allow_html=True)
@@ -267,11 +255,11 @@ def render_navbar_v2():
 
 # 메인 대시보드
 def main_dashboard():
-    data = load_data()
-    if ss.username_v2 not in data:
-        data[ss.username_v2] = initialize_user_data(ss.username_v2)
-        save_data(data)
-    user_data = data[ss.username_v2]
+    user_data = load_user_data(ss.username_v2)
+    if user_data is None:
+        user_data = initialize_user_data(ss.username_v2)
+        save_data_merge(ss.username_v2, user_data)
+    normalize_user_data(user_data)
 
     # 헤더(로그아웃을 우측으로, 살짝 안쪽)
     h1, spacer, h2 = st.columns([6, 1, 2], gap="small")
@@ -279,7 +267,7 @@ def main_dashboard():
     with h2:
         st.write("")
         if st.button("🔄 주가 업데이트", use_container_width=True):
-            update_stock_prices(user_data, data)
+            update_stock_prices(user_data)
             st.success("주가 업데이트 완료!"); st.rerun()
         if st.button("로그아웃", use_container_width=True):
             ss.logged_in_v2 = False; ss.username_v2 = ""; st.rerun()
@@ -292,94 +280,161 @@ def main_dashboard():
         display_companies(user_data)
     elif ss.active_tab_v2 == "📝 리서치 게시글":
         research_posts()
+    elif ss.active_tab_v2 == "📈 커뮤니티 통계":
+        community_stats()
     else:
-        edit_companies(user_data, data)
-
-# 주가 업데이트
-def update_stock_prices(user_data, data):
-    if user_data["destiny_company"]["stock_code"]:
-        stock_info = get_stock_price(user_data["destiny_company"]["stock_code"])
+        edit_companies(user_data)
+
+# 주가 업데이트 (Destiny + 관심 기업 전체를 한 번에 동시 조회)
+def update_stock_prices(user_data):
+    companies = [user_data["destiny_company"]] + user_data["interesting_companies"]
+    quotes = get_stock_prices([c["stock_code"] for c in companies if c.get("stock_code")])
+    for company in companies:
+        stock_info = quotes.get(company.get("stock_code"))
         if stock_info:
-            user_data["destiny_company"]["current_price"] = stock_info['price']
-            user_data["destiny_company"]["last_updated"] = stock_info['updated_at']
-            user_data["destiny_company"]["change"] = stock_info['change']
-            user_data["destiny_company"]["change_rate"] = stock_info['change_rate']
-    for company in user_data["interesting_companies"]:
-        if company["stock_code"]:
-            stock_info = get_stock_price(company["stock_code"])
-            if stock_info:
-                company["current_price"] = stock_info['price']
-                company["last_updated"] = stock_info['updated_at']
-                company["change"] = stock_info['change']
-                company["change_rate"] = stock_info['change_rate']
+            quote_service.apply_quote(company, stock_info)
     save_data_merge(ss.username_v2, user_data)
 
+# 로그인 직후 해당 사용자의 관심 종목 시세를 백그라운드에서 조회 시작
+def prefetch_user_quotes(username):
+    user_data = load_user_data(username)
+    if user_data:
+        companies = [user_data["destiny_company"]] + user_data.get("interesting_companies", [])
+        quote_service.prefetch([c.get("stock_code") for c in companies])
+
 # 기업 카드 표시
+COMPANY_PAGE_SIZE = 12
+LIVE_PRICE_TIMEOUT = 15   # 실시간 시세를 기다리는 최대 시간(초), 넘으면 저장된 값 유지
+AUTO_REFRESH_SEC = int(os.environ.get("CARD_REFRESH_SEC", "30"))   # 자동 갱신 모드에서 카드를 다시 그리는 주기(초)
+
+# 카드 HTML (가격 밴드는 이미 계산된 종목만 표시, 나머지는 계산되는 대로 채움)
+def render_cards(companies):
+    bands = {c["stock_code"]: price_history.peek_bands(c["stock_code"]) for c in companies if c.get("stock_code")}
+    return card_html.company_cards(companies, bands)
+
+# 자동 갱신 모드의 카드 1개: 주기마다 이 카드만 다시 실행 (페이지의 나머지/작성 중인 폼은 그대로)
+# 시세 캐시에 있는 최신 값으로 그리고, 만료됐으면 백그라운드 갱신만 걸어둠 (기다리지 않음 → 다음 주기에 반영)
+@st.fragment(run_every=AUTO_REFRESH_SEC)
+def live_company_card(company):
+    code = company.get("stock_code")
+    if code:
+        quote_service.prefetch([code])
+        price_history.prefetch([code])
+        stock_info = quote_service.quote_cache.peek(code)
+        if stock_info:
+            company = dict(company)   # 화면에만 반영 (저장은 주가 업데이트 버튼)
+            quote_service.apply_quote(company, stock_info)
+    st.markdown(render_cards([company]), unsafe_allow_html=True)
+
+# 카드 묶음 표시: 자동 갱신 모드면 카드마다 fragment, 아니면 markdown 1개로 묶고 시세는 나중에 채움(slots에 등록)
+def show_cards(companies, slots):
+    if ss.auto_refresh_v2:
+        for company in companies:
+            live_company_card(company)
+        return
+    slot = st.empty()
+    slot.markdown(render_cards(companies), unsafe_allow_html=True)
+    slots.append((slot, companies))
+
+# 카드는 저장된 값으로 먼저 그리고, 실시간 시세/가격 밴드는 페이지를 다 그린 뒤 도착하는 대로 채움
 def display_companies(user_data):
+    slots = []   # (placeholder, 그 안의 기업들)
+    st.toggle(f"⏱ 카드 자동 갱신 ({AUTO_REFRESH_SEC}초)", key="auto_refresh_v2",
+              help="카드만 주기적으로 다시 그립니다. 화면의 다른 부분은 다시 실행되지 않습니다.")
     st.markdown("### 🎯 Destiny 기업")
     destiny = user_data["destiny_company"]
     if destiny["name"]:
-        display_company_card(destiny, is_destiny=True)
+        show_cards([destiny], slots)
     else:
         st.info("Destiny 기업을 설정해주세요.")
 
     st.markdown("### 🔍 관심 기업들")
-    for i, company in enumerate(user_data["interesting_companies"]):
-        if company["name"]:
-            display_company_card(company, company_index=i)
-
-def display_company_card(company, is_destiny=False, company_index=None):
-    with st.container():
-        # 투자 신호
-        investment_signal, signal_color = "", "#333"
-        if company.get('current_price', 0) > 0:
-            if company['current_price'] <= company.get('target_buy', 0):
-                investment_signal, signal_color = "🟢 매수 신호", "#28a745"
-            elif company['current_price'] >= company.get('target_sell', 0):
-                investment_signal, signal_color = "🔴 매도 신호", "#dc3545"
-            else:
-                investment_signal, signal_color = "🟡 관망", "#ffc107"
-
-        # 등락
-        change_info = ""
-        if company.get('change') is not None and company.get('change_rate') is not None:
-            change = company['change']; change_rate = company['change_rate']
-            if change > 0:
-                change_info = f'<span class="price-change-up">▲{change:,}원 (+{change_rate:.2f}%)</span>'
-            elif change < 0:
-                change_info = f'<span class="price-change-down">▼{abs(change):,}원 ({change_rate:.2f}%)</span>'
-            else:
-                change_info = f'<span>보합 (0.00%)</span>'
-
-        last_updated_text = f"<small>📅 업데이트: {company.get('last_updated','')}</small>" if company.get('last_updated') else ""
-
-        st.markdown(f"""
-        <div class="company-card">
-            <h4>🏢 {company['name']}</h4>
-            <p>
-                <strong>현재가:</strong> {company['current_price']:,}원
-                &nbsp;&nbsp;
-                <span style="color:{signal_color}; font-weight:bold;">{investment_signal}</span>
-            </p>
-            <p>
-                <span class="valuation-buy">매수 목표: {company['target_buy']:,}원</span> | 
-                <span class="valuation-sell">매도 목표: {company['target_sell']:,}원</span>
-            </p>
-            <p><strong>특징:</strong> {company['description']}</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-        # 리서치 작성 → 리서치 탭 전환 + 폼 자동 열기 + 회사명 프리필
-        btn_key = f"research_v2_{'destiny' if is_destiny else f'company_{company_index}'}_{company['name']}"
-        if st.button(f"📝 {company['name']} 리서치 작성", key=btn_key):
-            ss.selected_company_v2 = company['name']
-            ss.show_research_form_v2 = True
-            ss.active_tab_v2 = "📝 리서치 게시글"
-            st.rerun()
+    companies = [c for c in user_data["interesting_companies"] if c["name"]]
+    if not companies:
+        st.info("⚙️ 기업 정보 수정 탭에서 관심 기업을 추가해주세요.")
+        research_launcher([destiny])
+        defer_live_prices(user_data, slots)
+        return
+    # 관심 기업이 많으면 페이지 단위로 카드 표시
+    n_pages = (len(companies) - 1) // COMPANY_PAGE_SIZE + 1
+    page = 1
+    if n_pages > 1:
+        page = st.radio("페이지", list(range(1, n_pages + 1)), horizontal=True, key="company_page_v2")
+        st.caption(f"총 {len(companies)}개 중 {(page - 1) * COMPANY_PAGE_SIZE + 1}~{min(page * COMPANY_PAGE_SIZE, len(companies))}번째")
+    page_companies = companies[(page - 1) * COMPANY_PAGE_SIZE: page * COMPANY_PAGE_SIZE]
+    # 한 페이지의 카드는 markdown 1개로 묶어서 전송
+    show_cards(page_companies, slots)
+    research_launcher([destiny] + page_companies)
+    defer_live_prices(user_data, slots)
+
+def defer_live_prices(user_data, slots):
+    codes = [c.get("stock_code") for _, companies in slots for c in companies]
+    # 밴드는 이미 계산된 종목이면 카드에 들어가 있으므로 아직 없는 종목만 기다림
+    # 이력 파일이 없는 종목(수십 페이지를 받아야 함)은 백그라운드로만 채우고 기다리지 않음 → 다음 rerun에 표시
+    bands = {code: f for code, f in price_history.prefetch(codes).items()
+             if price_history.peek_bands(code) is None and price_history.has_history(code)}
+    futures = {("quote", code): f for code, f in quote_service.prefetch(codes).items()}
+    futures.update({("bands", code): f for code, f in bands.items()})
+    if futures:
+        deferred.append(lambda: fill_live_prices(user_data, futures, slots))
+
+# 도착한 시세/밴드를 카드에 반영 (이미 받은 것들은 한 번에, 나머지는 도착할 때마다 해당 묶음만 다시 그림)
+def fill_live_prices(user_data, futures, slots):
+    pending = {future: key for key, future in futures.items()}
+    deadline = time.monotonic() + LIVE_PRICE_TIMEOUT
+    changed = False
+    while pending:
+        done, _ = concurrent.futures.wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                          return_when=concurrent.futures.FIRST_COMPLETED)
+        if not done:
+            break
+        arrived, new_bands = {}, set()
+        for future in done:
+            kind, code = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception:
+                continue   # 백그라운드 조회 실패는 저장된 값 유지
+            if result and kind == "quote":
+                arrived[code] = result
+            elif result:
+                new_bands.add(code)
+        for slot, companies in slots:
+            updated = False
+            for company in companies:
+                stock_info = arrived.get(company.get("stock_code"))
+                if stock_info and (company.get("current_price"), company.get("price_stale")) != (stock_info['price'], stock_info.get('stale', False)):
+                    quote_service.apply_quote(company, stock_info)
+                    updated = changed = True
+                elif company.get("stock_code") in new_bands:
+                    updated = True
+            if updated:
+                slot.markdown(render_cards(companies), unsafe_allow_html=True)
+    if changed:
+        save_data_merge(ss.username_v2, user_data)
+
+# 리서치 작성 → 리서치 탭 전환 + 폼 자동 열기 + 회사명 프리필 (카드마다 버튼 대신 선택 + 버튼 1개)
+def research_launcher(companies):
+    names = list(dict.fromkeys(c["name"] for c in companies if c["name"]))
+    if not names:
+        return
+    c1, c2, _ = st.columns([3, 1, 2], gap="small")
+    name = c1.selectbox("리서치 작성할 기업", names, key="research_pick_v2", label_visibility="collapsed")
+    if c2.button("📝 리서치 작성", key="research_v2_launch", use_container_width=True):
+        ss.selected_company_v2 = name
+        ss.show_research_form_v2 = True
+        ss.active_tab_v2 = "📝 리서치 게시글"
+        st.rerun()
 
 # 리서치 게시글
+FEED_SORTS = ["최신순", "인기순", "팔로잉"]
+HOT_FEED_SIZE = 50   # 인기순으로 보여줄 최대 게시글 수
+TIMELINE_FEED_SIZE = 50   # 팔로잉 타임라인에 보여줄 최대 게시글 수
+FEED_PAGE_SIZE = 50   # 최신순 피드에서 한 번에 더 보여줄 게시글 수
+
 def research_posts():
-    posts = load_posts()
+    store = get_post_store()
+    ss.setdefault("feed_limit_v2", FEED_PAGE_SIZE)
 
     # # ── 제목 + 우측 버튼(한 줄) ───────────────────────────
     # h_left, h_right = st.columns([6, 1], gap="small")
@@ -411,21 +466,50 @@ def research_posts():
 
 
     # ── 상단 필터(버튼은 위로 옮겼으니 여기선 셀렉트만) ──
-    all_companies = sorted(list({p.get('company','') for p in posts if p.get('company')}))
-    left, _ = st.columns([7, 2], gap="small")
+    # 보관 글은 사용자가 불러온 달까지만 (달별 캐시) → 그 글의 기업도 필터에 포함
+    archive_months = post_archive.months()
+    loaded_archive = [p for month in archive_months[:ss.archive_months_v2] for p in post_archive.load_month(month)]
+    all_companies = sorted(store.companies() | {p['company'] for p in loaded_archive if p.get('company')})
+    left, right = st.columns([7, 2], gap="small")
     with left:
         selected_company = st.selectbox("기업 선택", ["전체"] + all_companies,
                                         key="company_filter_v2")
+    with right:
+        feed_sort = st.radio("정렬", FEED_SORTS, horizontal=True, key="feed_sort_v2")
 
     # ── 작성 폼 열려있으면 표시 ───────────────────────────
     if ss.get('show_research_form_v2', False):
-        write_research_post(posts)
+        write_research_post()
 
     # ── 목록 표시 ─────────────────────────────────────────
-    filtered = posts if selected_company == "전체" else [p for p in posts if p.get('company') == selected_company]
-    filtered.sort(key=lambda x: x.get('timestamp',''), reverse=True)
+    if feed_sort == "인기순":
+        # 랭킹 인덱스에서 상위 N개 id만 꺼내 해당 글만 조회
+        top_ids = hot_feed_index(store).top(HOT_FEED_SIZE, None if selected_company == "전체" else selected_company)
+        filtered = [p for p in map(store.get, top_ids) if p is not None]
+    elif feed_sort == "팔로잉":
+        # 내 타임라인(팔로우한 작성자 + 내 글)에서 최근 N개 id만 꺼내 해당 글만 조회
+        filtered = [p for p in map(store.get, timeline.timeline_ids(ss.username_v2, TIMELINE_FEED_SIZE))
+                    if p is not None and (selected_company == "전체" or p.get('company') == selected_company)]
+        if not filtered:
+            st.info("팔로우한 작성자의 글이 여기에 모입니다. 게시글의 ➕ 팔로우 버튼으로 팔로우해보세요.")
+    else:
+        filtered, n_hot = store.latest(ss.feed_limit_v2, company=None if selected_company == "전체" else selected_company)
+        # 보관된 이전 글은 사용자가 요청한 달까지만 뒤에 붙임 (읽기 전용)
+        shown = {str(p['id']) for p in filtered}
+        filtered += [dict(p, archived=True) for p in loaded_archive
+                     if str(p['id']) not in shown and (selected_company == "전체" or p.get('company') == selected_company)]
+    following = timeline.following(ss.username_v2)
     for i, post in enumerate(filtered):
-        display_post(post, i)
+        display_post(post, i, following)
+    if feed_sort == "최신순" and n_hot > ss.feed_limit_v2:
+        if st.button(f"더 보기 ({n_hot - ss.feed_limit_v2})", key="more_feed_v2", use_container_width=True):
+            ss.feed_limit_v2 += FEED_PAGE_SIZE
+            st.rerun()
+    elif feed_sort == "최신순" and ss.archive_months_v2 < len(archive_months):
+        if st.button(f"📦 이전 글 더 보기 ({archive_months[ss.archive_months_v2]})", key="more_archive_v2",
+                     use_container_width=True):
+            ss.archive_months_v2 += 1
+            st.rerun()
 
     export_rows = filtered      # ← 화면에 보이는 목록만. 전체면: posts
 
@@ -445,9 +529,27 @@ def research_posts():
             mime="text/csv",
             use_container_width=True
         )     
+
+        # Parquet (타입 유지 + 기업/작성자 dictionary 인코딩, 노트북 분석용) — pyarrow가 있을 때만
+        if columnar_export.available():
+            st.download_button(
+                "📥 (현재 목록) Parquet 다운로드",
+                data=posts_parquet_cached(export_rows),
+                file_name=f"{fname_base}.parquet",
+                mime="application/vnd.apache.parquet",
+                use_container_width=True
+            )
     else:
         st.caption("내보낼 게시글이 없습니다.")
   
+# Parquet 인코딩은 목록(글/반응 수)이 바뀔 때만 다시 함 (매 rerun마다 만들지 않음)
+def posts_parquet_cached(rows):
+    key = tuple((str(p['id']), p.get('likes'), p.get('retweets'), post_store.comment_count(p)) for p in rows)
+    cached = ss.get("parquet_cache_v2")
+    if cached is None or cached[0] != key:
+        cached = ss.parquet_cache_v2 = (key, columnar_export.posts_parquet_bytes(rows))
+    return cached[1]
+
 def _open_write_form_v2():
     ss.show_research_form_v2 = True
 
@@ -456,7 +558,7 @@ def _close_write_form_v2():
     ss.selected_company_v2 = ""
     if 'temp_content' in ss: del ss['temp_content']
 
-def write_research_post(posts):
+def write_research_post():
     st.markdown("### ✍️ 새 리서치 작성")
     now = datetime.now()
 
@@ -523,16 +625,26 @@ def write_research_post(posts):
             st.rerun()
 
         if submit and company and content:
-            posts.append({
+            store = get_post_store()
+            duplicates = near_dup_index(store).find(content)
+            # 거의 같은 글이 이미 있으면 한 번 경고, 같은 내용으로 다시 누르면 duplicate_of 표시를 달고 게시
+            if duplicates and st.session_state.get('dup_warned_v2') != content:
+                st.session_state['dup_warned_v2'] = content
+                st.warning(duplicate_notice(store, duplicates[0]))
+                return
+            post = {
                 "id": str(uuid.uuid4()),   # ✅ 영구 고정 id
                 "company": company,
                 "content": content,
                 "author": st.session_state.username_v2,
                 "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
                 "is_public": is_public,
-                "likes": 0, "retweets": 0, "comments": []
-            })
-            save_posts(posts)
+                "likes": 0, "retweets": 0, "comment_count": 0
+            }
+            if duplicates:
+                post["duplicate_of"] = duplicates[0]
+            store.add_post(post)
+            st.session_state.pop('dup_warned_v2', None)
             st.session_state.show_research_form_v2 = False
             st.session_state.pop('selected_company_v2', None)
             st.session_state.pop('temp_content', None)
@@ -540,17 +652,16 @@ def write_research_post(posts):
             st.rerun()
 
 
-def display_post(post, index):
+def duplicate_notice(store, post_id):
+    original = store.get(post_id)
+    where = "이전에 보관된 글" if original is None else f"{original['author']}님이 {original['timestamp']}에 올린 글"
+    return f"🔁 {where}과 거의 같은 내용입니다. 그래도 올리려면 📝 게시하기를 한 번 더 누르세요."
+
+def display_post(post, index, following=frozenset()):
     with st.container():
-        st.markdown(f"""
-        <div class="post-card">
-            <div style="display:flex; justify-content:space-between; align-items:center;">
-                <h5>🏢 {post['company']}</h5>
-                <small>📅 {post['timestamp']} | 👤 {post['author']}</small>
-            </div>
-            <p>{post['content']}</p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(card_html.post_card(post), unsafe_allow_html=True)
+        if 'duplicate_of' in post:
+            st.caption("🔁 먼저 올라온 글과 거의 같은 내용입니다")
 
         # col1, col2, col3, _ = st.columns([1,1,1,3])
         # with col1:
@@ -562,37 +673,51 @@ def display_post(post, index):
         # with col3:
         #     st.write(f"💬 {len(post.get('comments', []))}")
 
-        col1, col2, col3, _ = st.columns([1,1,1,3])
+        if post.get('archived'):
+            # 보관된 글은 읽기 전용 (반응/댓글 작성 없음)
+            st.caption(f"❤️ {post['likes']} · 🔄 {post['retweets']} · 📦 보관된 글")
+            if post_store.comment_count(post) and st.toggle(f"댓글 보기 ({post_store.comment_count(post)})",
+                                                          key=f"show_comments_v2_{post['id']}"):
+                with st.container(border=True):
+                    display_comments(post, index)
+            return
+
+        col1, col2, col3, _ = st.columns([1,1,2,2])
         with col1:
             if st.button(f"❤️ {post['likes']}", key=f"like_v2_{post['id']}"):
-                posts = load_posts()
-                idx = next((i for i,p in enumerate(posts) if p.get('id') == post['id']), None)
-                if idx is not None:
-                    posts[idx]['likes'] += 1
-                    save_posts(posts)
+                if get_post_store().increment(post['id'], 'likes') is not None:
                     st.rerun()
         with col2:
             if st.button(f"🔄 {post['retweets']}", key=f"retweet_v2_{post['id']}"):
-                posts = load_posts()
-                idx = next((i for i,p in enumerate(posts) if p.get('id') == post['id']), None)
-                if idx is not None:
-                    posts[idx]['retweets'] += 1
-                    save_posts(posts)
+                if get_post_store().increment(post['id'], 'retweets') is not None:
                     st.rerun()
         with col3:
-            st.write(f"💬 {len(post.get('comments', []))}")
-
-        with st.expander(f"댓글 보기 ({len(post.get('comments', []))})"):
-            display_comments(post, index)
+            author = post.get('author', '')
+            if author and author != ss.username_v2:
+                if author in following:
+                    if st.button(f"✔️ {author} 팔로잉", key=f"follow_v2_{post['id']}", help="누르면 팔로우 취소"):
+                        timeline.unfollow(ss.username_v2, author); st.rerun()
+                elif st.button(f"➕ {author} 팔로우", key=f"follow_v2_{post['id']}"):
+                    timeline.follow(ss.username_v2, author); st.rerun()
+        n_comments = post_store.comment_count(post)
+
+        # 댓글 수는 토글 라벨에 표시 / 댓글은 펼쳤을 때만 불러오기 (expander는 닫혀 있어도 내용을 실행하므로 토글 사용)
+        if st.toggle(f"댓글 보기 ({n_comments})", key=f"show_comments_v2_{post['id']}"):
+            with st.container(border=True):
+                display_comments(post, index)
 
 def display_comments(post, post_index):
-    for i, comment in enumerate(post.get('comments', [])):
-        st.markdown(f"""
-        <div style="background-color:#e9ecef; padding:8px; margin:5px 0; border-radius:5px;">
-            <small><strong>{comment['author']}</strong> - {comment['timestamp']}</small><br>
-            ⤷ {comment['content']}
-        </div>
-        """, unsafe_allow_html=True)
+    # 페이지 단위로 불러오기 ("더 보기"를 누를 때마다 COMMENTS_PAGE_SIZE개씩 추가)
+    shown_key = f"comments_shown_v2_{post['id']}"
+    ss.setdefault(shown_key, post_store.COMMENTS_PAGE_SIZE)
+    comments = post_store.load_comments(post['id'], limit=ss[shown_key])
+    if comments:
+        st.markdown(card_html.comments(comments), unsafe_allow_html=True)
+
+    remaining = post_store.comment_count(post) - len(comments)
+    if remaining > 0 and st.button(f"댓글 더 보기 ({remaining})", key=f"more_comments_v2_{post['id']}"):
+        ss[shown_key] += post_store.COMMENTS_PAGE_SIZE
+        st.rerun()
 
     # with st.form(f"comment_form_v2_{post_index}"):
     #     new_comment = st.text_input("댓글 작성 (최대 140자)", max_chars=140, key=f"comment_input_v2_{post_index}")
@@ -605,6 +730,9 @@ def display_comments(post, post_index):
     #         })
     #         save_posts(posts); st.success("댓글이 추가되었습니다!"); st.rerun()
 
+    if post.get('archived'):
+        return
+
     with st.form(f"comment_form_v2_{post['id']}"):
         new_comment = st.text_input(
             "댓글 작성 (최대 140자)",
@@ -613,21 +741,80 @@ def display_comments(post, post_index):
         )
         submit_comment = st.form_submit_button("댓글 달기")
         if submit_comment and new_comment:
-            posts = load_posts()
-            idx = next((i for i,p in enumerate(posts) if p.get('id') == post['id']), None)
-            if idx is not None:
-                posts[idx].setdefault('comments', []).append({
-                    "content": new_comment,
-                    "author": ss.username_v2,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-                save_posts(posts)
+            comment = {
+                "content": new_comment,
+                "author": ss.username_v2,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+            if get_post_store().add_comment(post['id'], comment) is not None:
                 st.success("댓글이 추가되었습니다!")
                 st.rerun()
 
 
+# 커뮤니티 통계 (user_stats 인덱스에서 바로 조회, 게시글 전체를 훑지 않음)
+def community_stats():
+    stats = user_stats_index(get_post_store())
+
+    st.markdown("### 🙋 나의 활동")
+    mine = stats.get(ss.username_v2)
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("작성한 리서치", mine["posts"])
+    c2.metric("받은 좋아요", mine["likes_received"])
+    c3.metric("받은 리트윗", mine["retweets_received"])
+    c4.metric("작성한 댓글", mine["comments_made"])
+    if mine["top_companies"]:
+        st.caption("가장 많이 리서치한 기업: " + ", ".join(f"{name} ({n})" for name, n in mine["top_companies"]))
+
+    st.markdown("### 🏆 커뮤니티 리더보드")
+    board = stats.leaderboard(10)
+    if board:
+        rows = []
+        for rank, (username, score) in enumerate(board, start=1):
+            s = stats.get(username, top_companies=1)
+            rows.append({
+                "순위": rank, "사용자": username, "점수": score,
+                "리서치": s["posts"], "좋아요": s["likes_received"],
+                "리트윗": s["retweets_received"], "댓글": s["comments_made"],
+            })
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    else:
+        st.caption("아직 활동 기록이 없습니다.")
+
+    community_watchlist()
+
+POPULAR_SIZE = 20
+
+# 커뮤니티 관심 종목 (관심 기업 저장/글쓰기 때마다 증분 갱신되는 인덱스에서 상위 N개만 읽음)
+def community_watchlist():
+    index = popularity_index(get_post_store())
+    st.markdown("### 🔭 커뮤니티 관심 종목")
+    watched, researched = st.columns(2)
+
+    def table(rows):
+        return pd.DataFrame([{
+            "기업": r["name"] or r["code"], "코드": r["code"],
+            "Destiny": r["destiny"], "관심": r["interesting"], "리서치": r["posts"], "반응": r["reactions"],
+            "목표가 괴리": f"{r['mean_gap']:+.1%}" if r["mean_gap"] is not None else "-",
+        } for r in rows])
+
+    with watched:
+        st.markdown(f"**👀 관심 많은 종목 Top {POPULAR_SIZE}**")
+        rows = index.most_watched(POPULAR_SIZE)
+        if rows: st.dataframe(table(rows), hide_index=True, use_container_width=True)
+        else: st.caption("아직 관심 기업으로 등록된 종목이 없습니다.")
+    with researched:
+        st.markdown(f"**📝 리서치 많은 종목 Top {POPULAR_SIZE}**")
+        rows = index.most_researched(POPULAR_SIZE)
+        if rows: st.dataframe(table(rows), hide_index=True, use_container_width=True)
+        else: st.caption("관심 기업과 연결된 리서치 글이 없습니다.")
+    st.caption("목표가 괴리 = 관심 사용자들의 매도 목표가가 현재가보다 평균 몇 % 위(+)/아래(-)인지")
+
 # 기업 정보 수정
-def edit_companies(user_data, data):
+WATCHLIST_COLUMNS = {"name": "기업명", "stock_code": "주식 코드", "target_buy": "매수 목표가",
+                     "target_sell": "매도 목표가", "description": "기업 특징"}
+WATCHLIST_DEFAULTS = {"name": "", "stock_code": "", "target_buy": 0, "target_sell": 0, "description": ""}
+
+def edit_companies(user_data):
     st.markdown("### ⚙️ 기업 정보 관리")
     st.info("💡 **주식 코드 찾는 방법:** 네이버 증권에서 기업 검색 후 URL의 code= 뒤 6자리 숫자를 입력하세요. (예: 삼성전자 = 005930)")
 
@@ -664,40 +851,166 @@ def edit_companies(user_data, data):
             save_data_merge(ss.username_v2, user_data)
             st.success("Destiny 기업이 저장되었습니다!")
 
-    st.markdown("#### 🔍 관심 기업 5개 설정")
-    for i in range(5):
-        with st.expander(f"관심 기업 {i+1}"):
-            with st.form(f"company_form_v2_{i}"):
-                c = user_data["interesting_companies"][i]
-                col1, col2 = st.columns(2)
-                with col1:
-                    name = st.text_input("기업명", value=c.get("name", ""), key=f"name_v2_{i}")
-                    stock_code = st.text_input("주식 코드 (6자리)", value=c.get("stock_code", ""), max_chars=6, key=f"code_v2_{i}")
-                    current_price = st.number_input("현재가 (원)", value=c.get("current_price", 0), key=f"price_v2_{i}")
-                with col2:
-                    target_buy = st.number_input("매수 목표가 (원)", value=c.get("target_buy", 0), key=f"buy_v2_{i}")
-                    target_sell = st.number_input("매도 목표가 (원)", value=c.get("target_sell", 0), key=f"sell_v2_{i}")
-                description = st.text_area("기업 특징", value=c.get("description", ""), key=f"desc_v2_{i}")
-
-                c1, c2 = st.columns(2)
-                with c1:
-                    save_button = st.form_submit_button(f"💾 기업 {i+1} 저장", use_container_width=True)
-                with c2:
-                    test_price = st.form_submit_button(f"🔍 주가 확인", use_container_width=True)
-                    if test_price and stock_code and len(stock_code) == 6:
-                        with st.spinner("주가 정보를 가져오는 중..."):
-                            stock_info = get_stock_price(stock_code)
-                            if stock_info: st.success(f"현재가: {stock_info['price']:,}원")
-                            else: st.error("주가 정보를 가져올 수 없습니다. 주식 코드를 확인해주세요.")
-
-                if save_button:
-                    user_data["interesting_companies"][i] = {
-                        "name": name, "stock_code": stock_code, "current_price": current_price,
-                        "target_buy": target_buy, "target_sell": target_sell,
-                        "description": description, "last_updated": c.get("last_updated", "")
-                    }
-                    save_data_merge(ss.username_v2, user_data)
-                    st.success(f"관심 기업 {i+1}이 저장되었습니다!")
+    st.markdown("#### 🔍 관심 기업 설정")
+    st.caption("표에서 바로 수정하세요. 맨 아래 빈 행에 입력하면 추가, 행을 선택해 삭제할 수 있고, "
+               "'순서' 숫자를 바꾸면 카드 순서가 바뀝니다. 바뀐 행만 저장됩니다.")
+    companies = user_data["interesting_companies"]
+    editor_key = f"watchlist_editor_v2_{ss.watchlist_rev_v2}"
+    st.data_editor(
+        pd.DataFrame(
+            [{"순서": i + 1, **{label: c.get(field, WATCHLIST_DEFAULTS[field]) for field, label in WATCHLIST_COLUMNS.items()}}
+             for i, c in enumerate(companies)],
+            columns=["순서", *WATCHLIST_COLUMNS.values()]
+        ),
+        key=editor_key,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "순서": st.column_config.NumberColumn(min_value=1, step=1, width="small"),
+            "주식 코드": st.column_config.TextColumn(max_chars=6, validate=r"^\d{6}$"),
+            "매수 목표가": st.column_config.NumberColumn(min_value=0, step=1, format="%d"),
+            "매도 목표가": st.column_config.NumberColumn(min_value=0, step=1, format="%d"),
+            "기업 특징": st.column_config.TextColumn(width="large"),
+        },
+    )
+    c1, c2 = st.columns([1, 2])
+    with c1:
+        if st.button("💾 관심 기업 저장", use_container_width=True):
+            edits = ss.get(editor_key, {})
+            updated, n_changed = apply_watchlist_edits(companies, edits)
+            if n_changed:
+                user_data["interesting_companies"] = updated
+                save_data_merge(ss.username_v2, user_data)
+                ss.watchlist_rev_v2 += 1   # 저장 후 편집 상태 초기화
+                st.success(f"관심 기업 {n_changed}건이 저장되었습니다!")
+                st.rerun()
+            else:
+                st.info("변경된 내용이 없습니다.")
+    with c2:
+        with st.form("watchlist_price_check_v2"):
+            q1, q2 = st.columns([2, 1])
+            check_code = q1.text_input("주식 코드 (6자리)", max_chars=6, label_visibility="collapsed",
+                                       placeholder="주가 확인할 코드 (예: 005930)")
+            if q2.form_submit_button("🔍 주가 확인", use_container_width=True) and len(check_code) == 6:
+                with st.spinner("주가 정보를 가져오는 중..."):
+                    stock_info = get_stock_price(check_code)
+                    if stock_info: st.success(f"현재가: {stock_info['price']:,}원")
+                    else: st.error("주가 정보를 가져올 수 없습니다. 주식 코드를 확인해주세요.")
+        quote_cache_caption()
+
+    target_backtest(user_data)
+
+# 프로세스 공용 시세 캐시 상태 (없는 코드는 잠시 기억해 재조회하지 않음)
+def quote_cache_caption():
+    s = quote_service.quote_cache.stats()
+    st.caption(f"시세 캐시 {s['size']}/{s['max_entries']}종목 · 적중 {s['hits'] + s['stale_hits']} · "
+               f"없는 코드 재사용 {s['negative_hits']} · 조회 {s['misses']} · 제거 {s['evictions']}")
+
+# 목표가 규칙 백테스트 (가격은 저장된 일봉 또는 업로드한 CSV, 실행 버튼을 눌렀을 때만 계산)
+def target_backtest(user_data):
+    st.markdown("#### 📉 목표가 백테스트")
+    st.caption("지금 설정한 매수/매도 목표가대로 과거에 사고팔았다면? (신호 당일 종가 체결, 수수료·세금 미반영)")
+    uploaded = st.file_uploader("일봉 CSV (date, code, close) — 없으면 저장된 일봉 사용", type="csv", key="backtest_csv_v2")
+    if not st.button("▶️ 백테스트 실행", key="backtest_run_v2"):
+        return
+    targets = backtest.watchlist_targets(user_data)
+    try:
+        histories = backtest.histories_from_csv(uploaded) if uploaded else backtest.histories_from_store(targets)
+    except (ValueError, KeyError) as e:
+        st.error(f"CSV를 읽을 수 없습니다: {e}")
+        return
+    result = backtest.run(histories, targets)
+    if not result["codes"]:
+        st.info("가격 이력이 있는 관심 종목이 없습니다. (대시보드에서 가격 밴드가 표시된 종목부터 일봉이 저장됩니다)")
+        return
+    p = result["portfolio"]
+    m1, m2, m3 = st.columns(3)
+    m1.metric("기간", f"{p['start']}~{p['end']}")
+    m2.metric("수익률 (동일 비중)", f"{p['return']:.1%}")
+    m3.metric("최대 낙폭", f"{p['max_drawdown']:.1%}")
+    st.line_chart(pd.Series(result["equity"], index=pd.to_datetime(result["dates"].astype(str), format="%Y%m%d"), name="평가액"))
+    names = {c.get("stock_code"): c.get("name") for c in [user_data["destiny_company"]] + user_data["interesting_companies"]}
+    per_code = pd.DataFrame(result["per_code"])
+    per_code.insert(0, "기업", per_code["code"].map(names))
+    st.dataframe(per_code.rename(columns={"code": "코드", "trades": "거래 수", "win_rate": "승률", "return": "수익률",
+                                          "buy_hold": "보유 시 수익률", "max_drawdown": "최대 낙폭", "exposure": "보유 비중"}),
+                 hide_index=True, use_container_width=True)
+    if result["trades"]:
+        st.caption("거래 내역")
+        st.dataframe(pd.DataFrame(result["trades"]), hide_index=True, use_container_width=True)
+
+# 관심 기업 표 편집 내용(data_editor의 edited/added/deleted rows) → 새 리스트, 바뀐 행 수
+# 바뀌지 않은 행은 현재가/업데이트 시각 등을 그대로 유지
+def apply_watchlist_edits(companies, edits):
+    updated, order = [], []   # order: '순서'를 직접 입력한 행만 그 값, 나머지는 None
+    n_changed = 0
+    edited_rows = {int(k): v for k, v in edits.get("edited_rows", {}).items()}
+    deleted_rows = set(edits.get("deleted_rows", []))
+    fields = {label: field for field, label in WATCHLIST_COLUMNS.items()}
+    for i, company in enumerate(companies):
+        if i in deleted_rows:
+            n_changed += 1
+            continue
+        changes = edited_rows.get(i, {})
+        if changes:
+            n_changed += 1
+            company = dict(company)
+            for label, value in changes.items():
+                if label in fields:
+                    company[fields[label]] = _watchlist_value(fields[label], value)
+            if "주식 코드" in changes:   # 종목이 바뀌면 이전 시세는 버림
+                for key in ("current_price", "change", "change_rate", "price_stale"):
+                    company.pop(key, None)
+                company["current_price"] = 0
+                company["last_updated"] = ""
+        updated.append(company)
+        order.append(changes.get("순서"))
+    for row in edits.get("added_rows", []):
+        company = new_company(**{fields[label]: _watchlist_value(fields[label], value)
+                                 for label, value in row.items() if label in fields})
+        if company["name"] or company["stock_code"]:
+            n_changed += 1
+            updated.append(company)
+            order.append(row.get("순서"))
+    # 순서를 입력하지 않은 행은 기존 순서대로 두고, 입력한 행을 작은 번호부터 그 자리에 끼워 넣음
+    # ([A,B,C]에서 C→1이면 [C,A,B], A→3이면 [B,C,A])
+    result = [company for company, position in zip(updated, order) if not position]
+    pinned = sorted((int(position), k) for k, position in enumerate(order) if position)
+    for position, k in pinned:
+        result.insert(min(position, len(result) + 1) - 1, updated[k])
+    return result, n_changed
+
+def _watchlist_value(field, value):
+    if field in ("target_buy", "target_sell"):
+        return int(value or 0)
+    return "" if value is None else str(value).strip()
+
+# ----- 프로파일링 모드 -----
+# APP_PROFILE=1 이면 항상, 또는 관리자(APP_ADMINS, 쉼표 구분)가 ?profile=1 로 접속하면 rerun마다 프로파일 저장
+ADMIN_USERS = {u.strip() for u in os.environ.get("APP_ADMINS", "").split(",") if u.strip()}
+# 이번 rerun을 일으킨 버튼을 찾기 위한 key 접두어 (프로파일 파일 이름용)
+ACTION_KEY_PREFIXES = ("tabbtn_v2_", "like_v2_", "retweet_v2_", "research_v2_", "more_comments_v2_")
+
+def profiling_enabled():
+    if os.environ.get("APP_PROFILE") == "1":
+        return True
+    return st.query_params.get("profile") == "1" and ss.username_v2 in ADMIN_USERS
+
+def current_action():
+    for key in ss:
+        if isinstance(key, str) and key.startswith(ACTION_KEY_PREFIXES) and ss[key] is True:
+            return key
+    return "rerun"
+
+def render_profile_panel(path):
+    total, rows = profiling.top_functions(path)
+    with st.sidebar.expander("⏱️ 프로파일 (이번 실행)", expanded=True):
+        st.caption(f"총 {total * 1000:.1f}ms · {os.path.basename(path)}")
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
+# 이번 rerun에서 페이지를 다 그린 뒤 실행할 작업 (실시간 시세 채우기 등)
+deferred = []
 
 # 메인
 def main():
@@ -705,6 +1018,14 @@ def main():
         auth_page()
     else:
         main_dashboard()
+    while deferred:
+        deferred.pop(0)()
 
 if __name__ == "__main__":
-    main()
+    if profiling_enabled():
+        tab = ss.active_tab_v2 if ss.logged_in_v2 else "로그인"
+        profiling.profile_run(main, ss.username_v2 or "guest", tab, current_action(),
+                              on_done=lambda path: ss.__setitem__("last_profile_v2", path))
+        render_profile_panel(ss.last_profile_v2)
+    else:
+        main()
@@ -0,0 +1,192 @@
+# 거의 같은 글(같은 기사/평가 리포트를 여러 번 붙여넣은 글) 찾기: SimHash + LSH
+#  - 글마다 64비트 SimHash 서명 (공백/기호를 뺀 글자 SHINGLE개 묶음을 해시해 비트별 다수결)
+#    → 내용이 조금 다르면(날짜 태그, 줄바꿈, 몇 글자 수정) 서명도 몇 비트만 다름
+#  - 서명을 BANDS개 구간으로 나눠 구간 값별 버킷에 넣음. 해밍 거리 MAX_DISTANCE 이하(< BANDS)면
+#    적어도 한 구간은 값이 같으므로(비둘기집) 같은 버킷 후보만 비교 → 전체 글 수와 무관하게 조회
+#  - 글쓰기 화면에서는 게시 전에 검사해 경고하고, 그래도 게시하면 duplicate_of로 표시
+#  - 이미 쌓인 중복은 배치로 정리: python cli.py dedupe [--apply]
+import hashlib
+import re
+import threading
+
+import numpy as np
+
+import post_archive
+from post_store import to_epoch
+
+SHINGLE = 4         # 글자 n-gram 길이
+MIN_CHARS = 80      # 이보다 짧은 글은 검사하지 않음 (짧은 글끼리는 우연히 서명이 비슷함)
+BANDS = 4           # 64비트 = 16비트 × 4 구간
+MAX_DISTANCE = 3    # 이 이하 해밍 거리면 중복으로 봄 (BANDS보다 작아야 후보에서 빠지지 않음)
+
+_BAND_BITS = 64 // BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+_BIT = np.uint64(1) << np.arange(64, dtype=np.uint64)
+_NOISE = re.compile(r"[\W_]+")
+
+
+def _normalize(text):
+    return _NOISE.sub("", (text or "").lower())
+
+
+def _hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+
+
+# 본문 → 64비트 SimHash (짧은 글은 None)
+def simhash(text):
+    text = _normalize(text)
+    if len(text) < MIN_CHARS:
+        return None
+    shingles = {}
+    for i in range(len(text) - SHINGLE + 1):
+        s = text[i:i + SHINGLE]
+        shingles[s] = shingles.get(s, 0) + 1
+    hashes = np.fromiter((_hash(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+    weights = np.fromiter(shingles.values(), dtype=np.int64, count=len(shingles))
+    # 비트별로 (1이면 +가중치, 0이면 -가중치) 합 → 양수인 비트만 1
+    votes = np.where((hashes[:, None] & _BIT) != 0, 1, -1).T @ weights
+    return int(_BIT[votes > 0].sum())
+
+
+def distance(a, b):
+    return (a ^ b).bit_count()
+
+
+def _bands(sig):
+    return [(sig >> (band * _BAND_BITS)) & _BAND_MASK for band in range(BANDS)]
+
+
+class NearDupIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sigs = {}    # str(post id) -> (서명, 원래 id)
+        self._buckets = [{} for _ in range(BANDS)]   # 구간 값 -> {str(post id)}
+
+    def __len__(self):
+        return len(self._sigs)
+
+    # 저장소 이벤트 구독용
+    def __call__(self, event, post, **details):
+        if event == "post":
+            self.add(post['id'], post.get('content'))
+        elif event == "remove" and not details['archived']:   # 보관된 글은 계속 원본 후보로 둠
+            self.discard(post['id'])
+
+    def add(self, post_id, content=None, sig=None):
+        sig = simhash(content) if sig is None else sig
+        if sig is None:
+            return
+        key = str(post_id)
+        with self._lock:
+            self._sigs[key] = (sig, post_id)
+            for bucket, value in zip(self._buckets, _bands(sig)):
+                bucket.setdefault(value, set()).add(key)
+
+    def discard(self, post_id):
+        key = str(post_id)
+        with self._lock:
+            entry = self._sigs.pop(key, None)
+            if entry is None:
+                return
+            for bucket, value in zip(self._buckets, _bands(entry[0])):
+                bucket[value].discard(key)
+                if not bucket[value]:
+                    del bucket[value]
+
+    # 비슷한 글 id 목록 (가까운 순) — content 또는 미리 계산한 sig
+    def find(self, content=None, sig=None, exclude=None):
+        sig = simhash(content) if sig is None else sig
+        if sig is None:
+            return []
+        exclude = str(exclude) if exclude is not None else None
+        with self._lock:
+            candidates = set().union(*(bucket.get(value, ()) for bucket, value in zip(self._buckets, _bands(sig))))
+            candidates.discard(exclude)
+            found = [(distance(sig, self._sigs[key][0]), key) for key in candidates]
+            return [self._sigs[key][1] for d, key in sorted(found) if d <= MAX_DISTANCE]
+
+    # 중복 묶음들 [[원본 id, 중복 id, ...], ...] — ordered_ids(먼저 쓴 글부터) 순서로 원본을 정하고,
+    # 원본과 직접 MAX_DISTANCE 이내인 글만 묶음 (A~B, B~C여도 A와 먼 C는 A 묶음에 들어가지 않음)
+    def groups(self, ordered_ids):
+        assigned, result = set(), []
+        for post_id in ordered_ids:
+            key = str(post_id)
+            if key in assigned or key not in self._sigs:
+                continue
+            members = [other for other in self.find(sig=self._sigs[key][0], exclude=post_id) if str(other) not in assigned]
+            if members:
+                assigned.add(key)
+                assigned.update(map(str, members))
+                result.append([post_id] + members)
+        return result
+
+    # 게시글 저장소(+ archived=True면 보관된 글)로 처음부터 다시 계산
+    def rebuild(self, store, archived=True):
+        with store.lock:
+            table = store.table
+            rows = [(table.ids[i], table.content[i]) for i in range(len(table))]
+        if archived:
+            rows += [(post['id'], post.get('content')) for post in post_archive.iter_archived()]
+        with self._lock:
+            self._sigs = {}
+            self._buckets = [{} for _ in range(BANDS)]
+        for post_id, content in rows:
+            self.add(post_id, content)
+
+
+# 저장소에 연결: 현재 글로 계산하고 새 글을 구독한 뒤 보관 글을 추가 (보관 파일을 읽는 동안 저장소를 잡지 않음)
+def attach(store):
+    index = NearDupIndex()
+    with store.lock:
+        index.rebuild(store, archived=False)
+        store.subscribe(index)
+    for post in post_archive.iter_archived():
+        index.add(post['id'], post.get('content'))
+    return index
+
+
+# 이미 저장된 중복 정리 (보관된 글은 읽기 전용이라 원본 판단에만 사용)
+#  - 먼저 쓴 글을 원본으로 남기고, 원본과 가까운 글만 그 원본의 중복으로 봄
+#  - 같은 작성자가 다시 올렸고 댓글이 없는 글 → 삭제, 좋아요/리트윗은 원본에 합침 (merge)
+#  - 그 밖의 글 → duplicate_of 표시만 (flag)
+# → [(원본 글, 합칠 글 목록, 표시할 글 목록)], apply=False면 계획만 계산
+def dedupe(store, apply=False):
+    index = NearDupIndex()
+    order = []          # (작성 시각, str id, id)
+    archived_keys = set()
+    with store.lock:
+        table = store.table
+        rows = [(table.ts[i], table.ids[i], table.content[i]) for i in range(len(table))]
+    for ts, post_id, content in rows:
+        index.add(post_id, content)
+        order.append((ts, str(post_id), post_id))
+    for post in post_archive.iter_archived():
+        index.add(post['id'], post.get('content'))
+        order.append((to_epoch(post.get('timestamp')) or 0, str(post['id']), post['id']))
+        archived_keys.add(str(post['id']))
+    groups = index.groups([post_id for _, _, post_id in sorted(order)])
+
+    wanted = {str(post_id) for ids in groups for post_id in ids} & archived_keys
+    archived = {str(p['id']): dict(p, archived=True) for p in post_archive.iter_archived() if str(p['id']) in wanted} if wanted else {}
+    plan = []
+    for ids in groups:
+        original, *rest = (archived.get(str(post_id)) or store.get(post_id) for post_id in ids)
+        rest = sorted((p for p in rest if p is not None and not p.get('archived')), key=lambda p: p.get('timestamp', ''))
+        merge = [p for p in rest if not original.get('archived') and p['author'] == original['author']
+                 and not p.get('comment_count')]
+        flag = [p for p in rest if p not in merge and p.get('duplicate_of') != original['id']]
+        if merge or flag:
+            plan.append((original, merge, flag))
+    if apply:
+        merged = []
+        for original, merge, flag in plan:
+            for field in ('likes', 'retweets'):
+                gained = sum(p.get(field, 0) for p in merge)
+                if gained:
+                    store.increment(original['id'], field, gained)
+            merged += [p['id'] for p in merge]
+            for post in flag:
+                store.set_field(post['id'], 'duplicate_of', original['id'])
+        store.remove(merged)   # 게시글 파일은 한 번만 다시 씀
+    return plan
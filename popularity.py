@@ -0,0 +1,184 @@
+# 커뮤니티 관심 종목 인덱스 (종목 코드별 집계, 관심 기업 저장/게시글 변경 시 증분 갱신)
+#  - 관심 사용자 수(Destiny / 관심 기업), 리서치 글 수, 받은 반응(좋아요+리트윗+댓글), 평균 목표가 괴리율
+#  - 게시글에는 기업명만 있으므로 관심 기업 목록의 기업명 → 종목 코드로 연결
+#    (아직 아무도 관심 기업으로 등록하지 않은 이름의 글은 이름별로 모아뒀다가 코드가 생기면 합침)
+#  - "관심 많은 종목" / "리서치 많은 종목" 정렬 리스트를 유지해 상위 N개를 바로 슬라이스
+import re
+import threading
+from bisect import bisect_left, insort
+
+import post_archive
+import user_store
+
+_SPACES = re.compile(r"\s+")
+
+
+def _name_key(name):
+    return _SPACES.sub("", name or "").lower()
+
+
+def _empty():
+    return {"name": "", "destiny": 0, "interesting": 0, "posts": 0, "reactions": 0, "gap_sum": 0.0, "gap_n": 0}
+
+
+# 목표가 괴리율: 매도 목표가가 현재가보다 몇 % 위/아래인지 (가격이나 목표가가 없으면 None)
+def target_gap(company):
+    price, target = company.get("current_price") or 0, company.get("target_sell") or 0
+    return target / price - 1 if price > 0 and target > 0 else None
+
+
+# 관심 기업 레코드 1개 → {code: (역할, 기업명, 괴리율)} (같은 종목이 두 번 있으면 Destiny 우선)
+def _contribution(record):
+    record = record or {}
+    slots = [("interesting", c) for c in record.get("interesting_companies") or []]
+    slots.append(("destiny", record.get("destiny_company") or {}))
+    return {c["stock_code"]: (role, c.get("name", ""), target_gap(c)) for role, c in slots if c.get("stock_code")}
+
+
+class Popularity:
+    def __init__(self):
+        self._lock = threading.RLock()   # rebuild가 전체를 잡은 채 내부 갱신 메서드를 호출
+        self._reset()
+
+    def _reset(self):
+        self._codes = {}        # code -> 집계
+        self._users = {}        # username -> 그 사용자가 더한 {code: (역할, 기업명, 괴리율)}
+        self._code_of = {}      # 기업명 키 -> code
+        self._unresolved = {}   # 기업명 키 -> {"posts", "reactions"} (코드를 아직 모르는 글)
+        self._watched = []      # (-관심 사용자, -Destiny, code) 오름차순
+        self._researched = []   # (-글 수, -반응, code) 오름차순
+        self._keys = {}         # code -> (watched 키, researched 키)
+
+    def __len__(self):
+        return len(self._codes)
+
+    # ----- 관심 기업 -----
+    # user_store 구독용: 사용자의 이전 기여를 빼고 새 레코드의 기여를 더함
+    def watchlist_saved(self, username, record):
+        new = _contribution(record)
+        with self._lock:
+            old = self._users.get(username, {})
+            for code, (role, _, gap) in old.items():
+                stats = self._codes[code]
+                stats[role] -= 1
+                if gap is not None:
+                    stats["gap_sum"] -= gap
+                    stats["gap_n"] -= 1
+                self._rekey(code)
+            for code, (role, name, gap) in new.items():
+                stats = self._stats(code)
+                stats[role] += 1
+                if name:
+                    stats["name"] = name
+                    self._resolve(_name_key(name), code)
+                if gap is not None:
+                    stats["gap_sum"] += gap
+                    stats["gap_n"] += 1
+                self._rekey(code)
+            self._users[username] = new
+
+    # lock 안에서 호출: 처음 보는 기업명이면 코드에 연결하고 모아둔 글 수를 옮김 (먼저 등록된 코드 우선)
+    def _resolve(self, key, code):
+        if not key or key in self._code_of:
+            return
+        self._code_of[key] = code
+        pending = self._unresolved.pop(key, None)
+        if pending:
+            stats = self._codes[code]
+            stats["posts"] += pending["posts"]
+            stats["reactions"] += pending["reactions"]
+
+    # ----- 게시글 -----
+    # 저장소 이벤트 구독용 (댓글은 comment_count "increment"로 함께 들어옴)
+    def __call__(self, event, post, **details):
+        if event == "post":
+            self._add_post(post.get('company'), 1, sum(int(post.get(f, 0) or 0) for f in ("likes", "retweets", "comment_count")))
+        elif event == "increment":
+            self._add_post(post.get('company'), 0, details['by'])
+        elif event == "remove" and not details['archived']:   # 보관된 글은 계속 집계에 포함
+            self._add_post(post.get('company'), -1, -sum(int(post.get(f, 0) or 0) for f in ("likes", "retweets", "comment_count")))
+
+    def _add_post(self, company, posts, reactions):
+        key = _name_key(company)
+        if not key:
+            return
+        with self._lock:
+            code = self._code_of.get(key)
+            if code is None:
+                pending = self._unresolved.setdefault(key, {"posts": 0, "reactions": 0})
+                pending["posts"] += posts
+                pending["reactions"] += reactions
+                return
+            stats = self._codes[code]
+            stats["posts"] += posts
+            stats["reactions"] += reactions
+            self._rekey(code)
+
+    # ----- 정렬 리스트 -----
+    def _stats(self, code):
+        return self._codes.setdefault(code, _empty())
+
+    # lock 안에서 호출: code의 두 정렬 키를 새 값으로 교체
+    def _rekey(self, code):
+        stats = self._codes[code]
+        old = self._keys.pop(code, None)
+        if old is not None:
+            self._remove(self._watched, old[0])
+            self._remove(self._researched, old[1])
+        watchers = stats["destiny"] + stats["interesting"]
+        keys = ((-watchers, -stats["destiny"], code), (-stats["posts"], -stats["reactions"], code))
+        if watchers == 0 and stats["posts"] == 0:
+            return   # 아무도 보지 않는 종목은 목록에서 뺌 (집계는 남겨둠)
+        self._keys[code] = keys
+        insort(self._watched, keys[0])
+        insort(self._researched, keys[1])
+
+    @staticmethod
+    def _remove(board, key):
+        i = bisect_left(board, key)
+        if i < len(board) and board[i] == key:
+            board.pop(i)
+
+    # ----- 조회 -----
+    def get(self, code):
+        with self._lock:
+            stats = dict(self._codes.get(code) or _empty())
+        gap_sum, gap_n = stats.pop("gap_sum"), stats.pop("gap_n")
+        return dict(stats, code=code, watchers=stats["destiny"] + stats["interesting"],
+                    mean_gap=gap_sum / gap_n if gap_n else None)
+
+    # 관심 사용자가 많은 상위 n개 종목
+    def most_watched(self, n=20):
+        with self._lock:
+            codes = [code for neg_watchers, _, code in self._watched[:n] if neg_watchers < 0]
+        return [self.get(code) for code in codes]
+
+    # 리서치 글이 많은 상위 n개 종목
+    def most_researched(self, n=20):
+        with self._lock:
+            codes = [code for neg_posts, _, code in self._researched[:n] if neg_posts < 0]
+        return [self.get(code) for code in codes]
+
+    # 관심 기업 전체 + 게시글(보관 글 포함)로 처음부터 다시 계산
+    # 저장소 lock → 인덱스 lock 순서로 끝까지 잡음: 도중에 들어온 관심 기업 저장은 rebuild가 끝난 뒤 적용되므로
+    # 먼저 읽은 옛 레코드가 새 저장을 덮어쓰지 않음
+    def rebuild(self, store):
+        with store.lock, self._lock:
+            self._reset()
+            for username, record in user_store.iter_investments():
+                self.watchlist_saved(username, record)
+            table = store.table
+            for i in range(len(table)):
+                self._add_post(table.company[i], 1, table.likes[i] + table.retweets[i] + table.comment_count[i])
+            for p in post_archive.iter_archived():
+                self._add_post(p.get('company'), 1, sum(int(p.get(f, 0) or 0) for f in ("likes", "retweets", "comment_count")))
+
+
+# 저장소 + 관심 기업 저장에 연결: 변경을 구독하고 한 번 계산
+def attach(store):
+    index = Popularity()
+    user_store.subscribe_investments(index.watchlist_saved)   # rebuild 중에 온 저장은 rebuild가 끝난 뒤 적용됨
+    with store.lock:
+        index.rebuild(store)
+        store.subscribe(index)
+    return index
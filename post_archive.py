@@ -0,0 +1,83 @@
+# 오래된 게시글 보관 계층 (월별 압축 파일)
+#  - 작성 후 HOT_DAYS일이 지난 글은 archive/posts_YYYY-MM.jsonl.gz 로 옮기고 게시글 파일에는 최근 글만 남김
+#    → 평소 읽기/쓰기(저장소 로드, 주기적 저장)는 최근 글 양에만 비례
+#  - 보관된 글은 읽기 전용. 피드에서 사용자가 이전 글을 요청할 때만 한 달 치씩 읽고, 읽은 달은 메모리에 캐시
+#  - 옮기기는 배치 작업으로 실행: python cli.py archive [--days N]
+import gzip
+import json
+import os
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+
+ARCHIVE_DIR = "archive"
+HOT_DAYS = int(os.environ.get("POSTS_HOT_DAYS", "180"))   # 게시글 파일에 남길 기간(일)
+
+_SEGMENT = re.compile(r"^posts_(\d{4}-\d{2})\.jsonl\.gz$")
+
+
+def segment_path(month):
+    return os.path.join(ARCHIVE_DIR, f"posts_{month}.jsonl.gz")
+
+# 보관된 달 목록 (최근 달부터)
+def months():
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    found = (_SEGMENT.match(name) for name in os.listdir(ARCHIVE_DIR))
+    return sorted((m.group(1) for m in found if m), reverse=True)
+
+
+def _read(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+# 파일이 바뀌면(mtime) 다시 읽음
+@lru_cache(maxsize=24)
+def _load(path, mtime):
+    return tuple(_read(path))
+
+# 한 달 치 보관 글 (최근 글부터, 호출하는 쪽은 dict를 수정하지 말 것)
+def load_month(month):
+    path = segment_path(month)
+    if not os.path.exists(path):
+        return ()
+    return _load(path, os.path.getmtime(path))
+
+# 배치 작업용: 전체 보관 글을 하나씩 (캐시하지 않음)
+def iter_archived():
+    for month in months():
+        yield from _read(segment_path(month))
+
+def archived_ids():
+    return {str(post['id']) for post in iter_archived()}
+
+
+# 기존 보관 파일과 합쳐(같은 id는 새 값으로) 다시 씀 → 여러 번 실행해도 중복 없음
+def write_month(month, posts):
+    path = segment_path(month)
+    merged = {str(p['id']): p for p in (_read(path) if os.path.exists(path) else ())}
+    merged.update((str(p['id']), p) for p in posts)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        for post in sorted(merged.values(), key=lambda p: p.get('timestamp', ''), reverse=True):
+            f.write(json.dumps(post, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+# days일보다 오래된 글을 보관 파일로 옮김 → {달: 옮긴 글 수}
+def archive_posts(store, days=HOT_DAYS):
+    cutoff = int(time.time()) - days * 86400
+
+    def keep(posts):
+        by_month = {}
+        for post in posts:
+            by_month.setdefault(post['timestamp'][:7], []).append(post)
+        for month, items in by_month.items():
+            write_month(month, items)
+
+    moved = store.detach_older_than(cutoff, keep)
+    return Counter(post['timestamp'][:7] for post in moved)
@@ -0,0 +1,533 @@
+# 리서치 게시글/댓글 저장소 (Streamlit 비의존 → CLI/배치에서도 재사용)
+import atexit
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from array import array
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:   # Windows: 쓰기 잠금 없이 동작
+    fcntl = None
+
+POSTS_FILE = "posts_data_v2.json"
+JOURNAL_SUFFIX = ".journal"    # 아직 게시글 파일에 반영되지 않은 변경 기록
+LOCK_SUFFIX = ".lock"          # 쓰기용으로 연 프로세스가 잡는 잠금 파일 (앱 또는 CLI 배치 하나만)
+FLUSH_INTERVAL = float(os.environ.get("POSTS_FLUSH_INTERVAL", "2.0"))  # 백그라운드 저장 주기(초)
+COMMENTS_DIR = "comments_v2"   # 게시글 id별 댓글 파일(JSON Lines, 한 줄 = 댓글 1개)
+COMMENTS_PAGE_SIZE = 20
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def load_posts(path=POSTS_FILE):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+    return []
+
+
+# ----- 스트리밍 읽기/쓰기 (배치 작업용: 파일 크기와 무관하게 게시글 1개 분량의 메모리만 사용) -----
+STREAM_CHUNK_SIZE = 64 * 1024
+_decoder = json.JSONDecoder()
+
+# JSON 배열 파일은 증분 파싱, .jsonl 파일은 한 줄씩 → 게시글을 하나씩 yield
+def iter_posts(path=POSTS_FILE, chunk_size=STREAM_CHUNK_SIZE):
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        buf, pos, eof = "", 0, False
+        started = False
+        while True:
+            # 구분자(공백, '[', ',') 건너뛰기
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ',' or (buf[pos] == '[' and not started)):
+                started = started or buf[pos] == '['
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            if pos < len(buf):
+                try:
+                    post, end = _decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    yield post
+                    pos = end
+                    continue
+            elif eof:
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+
+# 게시글 iterable → JSON 배열 파일 (한 번에 하나씩 임시 파일에 쓰고 마지막에 교체
+# → 저장 도중 중단돼도 기존 파일이 깨지지 않음)
+def write_posts_stream(posts, path=POSTS_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        if path.endswith(".jsonl"):
+            for post in posts:
+                f.write(json.dumps(post, ensure_ascii=False) + "\n")
+        else:
+            f.write("[")
+            for i, post in enumerate(posts):
+                f.write(",\n  " if i else "\n  ")
+                f.write(json.dumps(post, ensure_ascii=False))
+            f.write("\n]")
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ----- 댓글 저장소 -----
+# 댓글은 게시글 파일에 넣지 않고 게시글 id별 파일에 덧붙여(append) 저장
+# 게시글 레코드에는 개수(comment_count)만 남겨 피드 로딩 시 댓글을 읽지 않음
+def comments_path(post_id):
+    return os.path.join(COMMENTS_DIR, f"{post_id}.jsonl")
+
+def append_comment(post_id, comment):
+    os.makedirs(COMMENTS_DIR, exist_ok=True)
+    with open(comments_path(post_id), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(comment, ensure_ascii=False) + "\n")
+
+# 오래된 순으로 offset부터 limit개 (limit=None이면 끝까지)
+def load_comments(post_id, offset=0, limit=COMMENTS_PAGE_SIZE):
+    path = comments_path(post_id)
+    if not os.path.exists(path):
+        return []
+    page = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            if i < offset or not line.strip():
+                continue
+            if limit is not None and len(page) >= limit:
+                break
+            page.append(json.loads(line))
+    return page
+
+def comment_count(post):
+    return post.get('comment_count', len(post.get('comments', [])))
+
+
+# 댓글 파일을 통째로 씀: 임시 파일에 다 쓴 뒤 교체 → 파일이 있으면 항상 완전한 상태
+# (이전 도중 중단돼도 다음 로드 때 게시글 안의 댓글로 다시 이전)
+def _write_comments(post_id, comments):
+    os.makedirs(COMMENTS_DIR, exist_ok=True)
+    path = comments_path(post_id)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for comment in comments:
+            f.write(json.dumps(comment, ensure_ascii=False) + "\n")
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+# 기존 형식(게시글 안의 comments 리스트) → 댓글 저장소로 이전 (변경이 있으면 True)
+def migrate_inline_comments(posts):
+    changed = False
+    for post in posts:
+        if 'comments' not in post:
+            continue
+        inline = post.pop('comments') or []
+        if inline and not os.path.exists(comments_path(post['id'])):
+            _write_comments(post['id'], inline)
+        post['comment_count'] = len(inline)
+        changed = True
+    return changed
+
+
+# ----- 메모리용 압축 게시글 표현 -----
+# 게시글 dict 수천 개 대신 컬럼 배열로 보관
+#  - 기업명/작성자: sys.intern으로 같은 문자열 1개만 공유
+#  - 작성 시각: "%Y-%m-%d %H:%M:%S" 문자열 → epoch 정수(array 'q')
+#  - 좋아요/리트윗/댓글 수: array 'i', 공개 여부: bytearray
+# 화면/내보내기에는 row()/rows()/to_dicts()로 필요할 때만 dict로 변환
+COUNTER_FIELDS = ('likes', 'retweets', 'comment_count')
+
+def to_epoch(text):
+    try:
+        return int(datetime.strptime(text, TIMESTAMP_FORMAT).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+def from_epoch(ts):
+    return datetime.fromtimestamp(ts).strftime(TIMESTAMP_FORMAT)
+
+
+class PostTable:
+    __slots__ = ("ids", "company", "author", "content", "ts", "is_public",
+                 "likes", "retweets", "comment_count", "extra", "_index")
+
+    def __init__(self):
+        self.ids = []
+        self.company = []
+        self.author = []
+        self.content = []
+        self.ts = array('q')
+        self.is_public = bytearray()
+        self.likes = array('i')
+        self.retweets = array('i')
+        self.comment_count = array('i')
+        self.extra = {}    # row -> 그 밖의 필드 (드물게 존재)
+        self._index = {}   # post id -> row
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index_of(self, post_id):
+        return self._index.get(post_id)
+
+    def append(self, post):
+        post = dict(post)
+        row = len(self.ids)
+        post_id = post.pop('id')
+        self.ids.append(post_id)
+        self._index[post_id] = row
+        self.company.append(sys.intern(post.pop('company', '') or ''))
+        self.author.append(sys.intern(post.pop('author', '') or ''))
+        self.content.append(post.pop('content', ''))
+        text = post.pop('timestamp', '')
+        epoch = to_epoch(text)
+        if epoch is None:
+            epoch = 0
+            post['timestamp'] = text  # 형식이 다른 값은 원문 그대로 보존
+        self.ts.append(epoch)
+        self.is_public.append(1 if post.pop('is_public', True) else 0)
+        for field in COUNTER_FIELDS:
+            getattr(self, field).append(int(post.pop(field, 0) or 0))
+        if post:
+            self.extra[row] = post
+        return row
+
+    def get(self, row, field):
+        if field in COUNTER_FIELDS:
+            return getattr(self, field)[row]
+        return self.row(row).get(field)
+
+    def set(self, row, field, value):
+        if field in COUNTER_FIELDS:
+            getattr(self, field)[row] = value
+        else:
+            self.extra.setdefault(row, {})[field] = value
+
+    def row(self, i):
+        post = {
+            "id": self.ids[i],
+            "company": self.company[i],
+            "content": self.content[i],
+            "author": self.author[i],
+            "timestamp": from_epoch(self.ts[i]) if self.ts[i] else "",
+            "is_public": bool(self.is_public[i]),
+            "likes": self.likes[i],
+            "retweets": self.retweets[i],
+            "comment_count": self.comment_count[i],
+        }
+        if i in self.extra:
+            post.update(self.extra[i])
+        return post
+
+    def rows(self):
+        for i in range(len(self.ids)):
+            yield self.row(i)
+
+    def to_dicts(self):
+        return list(self.rows())
+
+    # 컬럼만 복사한 테이블 (dict 변환 없이 lock 안에서 짧게 뜨는 스냅샷)
+    def copy(self):
+        table = PostTable()
+        table.ids = list(self.ids)
+        table.company = list(self.company)
+        table.author = list(self.author)
+        table.content = list(self.content)
+        table.ts = array('q', self.ts)
+        table.is_public = bytearray(self.is_public)
+        for field in COUNTER_FIELDS:
+            setattr(table, field, array('i', getattr(self, field)))
+        table.extra = {row: dict(fields) for row, fields in self.extra.items()}
+        table._index = dict(self._index)
+        return table
+
+
+# 다른 프로세스(실행 중인 앱 등)가 이미 쓰기용으로 열어 둔 저장소
+class StoreLocked(Exception):
+    pass
+
+# path의 쓰기 잠금(flock)을 잡은 파일 객체 (닫으면 풀림, 프로세스가 죽어도 OS가 풀어줌)
+def _lock_for_writing(path):
+    if fcntl is None:
+        return None
+    f = open(path + LOCK_SUFFIX, 'a')
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        raise StoreLocked(f"다른 프로세스가 사용 중: {path}") from None
+    return f
+
+
+# ----- write-behind 게시글 저장소 -----
+# 변경(글쓰기/좋아요/리트윗/댓글 수)은 메모리에 즉시 반영하고 저널에 한 줄 기록(fsync)한 뒤 응답
+# 백그라운드 writer가 FLUSH_INTERVAL마다 쌓인 변경을 한 번의 파일 쓰기로 묶어 저장하고 저널을 비움
+# 저널은 절대값으로 기록(add/set)하므로 재시작 시 여러 번 재생해도 결과가 같음
+# subscribe(listener)로 등록한 인덱스들은 변경마다 listener(event, post, **details)로 통지받음
+#  - "post": 새 글 / "increment": field, by / "comment": comment / "update": field, value (카운터 외 필드)
+#  - "remove": 저장소에서 빠진 글 / archived (True면 보관 계층으로 옮겨진 글, False면 삭제)
+#  - "flush": 파일 저장 완료(post=None)
+# 쓰기용으로 열면 잠금 파일을 잡음 → 앱이 실행 중이면 CLI의 정리 작업은 StoreLocked로 거부됨
+# read_only=True: 잠금 없이 읽기만 (앱이 실행 중이어도 가능, 변경/파일 저장 안 함)
+class PostStore:
+    def __init__(self, path=POSTS_FILE, flush_interval=FLUSH_INTERVAL, read_only=False):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.flush_interval = flush_interval
+        self.read_only = read_only
+        self._lock_file = None if read_only else _lock_for_writing(path)
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()   # flush는 한 번에 하나씩 (스냅샷 → 파일 교체 → 저널 비우기까지)
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._dirty = False
+        self._listeners = []
+
+        self._table = PostTable()
+        for post in iter_posts(path):
+            if post.get('id') is None:
+                post['id'] = str(uuid.uuid4())   # id 없는 예전 글은 새 id를 붙여 다음 저장 때 파일에 반영
+                self._dirty = True
+            self._dirty = migrate_inline_comments([post]) or self._dirty
+            self._table.append(post)
+        self._replay_journal()
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+        self._writer = threading.Thread(target=self._run, name="posts-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # 읽기: 현재 메모리 상태를 dict 리스트로 (호출 시점에만 변환)
+    def snapshot(self):
+        with self._lock:
+            return self._table.to_dicts()
+
+    # 피드용: 최신 글부터 offset번째~limit개만 dict로 (company를 주면 그 기업 글만)
+    # → (글 목록, 조건에 맞는 전체 글 수), 나머지 글은 컬럼에서 시각만 비교
+    def latest(self, limit, offset=0, company=None):
+        with self._lock:
+            table = self._table
+            rows = range(len(table)) if company is None else [i for i in range(len(table)) if table.company[i] == company]
+            top = heapq.nlargest(offset + limit, rows, key=table.ts.__getitem__)
+            return [table.row(i) for i in top[offset:]], len(rows)
+
+    # 기업명 목록 (필터용, dict 변환 없음)
+    def companies(self):
+        with self._lock:
+            return set(self._table.company) - {''}
+
+    def get(self, post_id):
+        with self._lock:
+            row = self._table.index_of(post_id)
+            return None if row is None else self._table.row(row)
+
+    # 압축 표현 그대로 읽기 (호출하는 쪽은 lock 안에서 쓰거나 값만 복사해 갈 것)
+    @property
+    def table(self):
+        return self._table
+
+    @property
+    def lock(self):
+        return self._lock
+
+    def subscribe(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    # 저장소 lock 안에서 호출되므로 listener는 가볍게 유지할 것
+    def _emit(self, event, post, **details):
+        for listener in self._listeners:
+            listener(event, post, **details)
+
+    def add_post(self, post):
+        with self._lock:
+            self._log({"op": "add", "post": post})
+            self._apply_add(post)
+            self._emit("post", self._table.row(self._table.index_of(post['id'])))
+
+    # field: 'likes' | 'retweets' | 'comment_count'
+    def increment(self, post_id, field, by=1):
+        with self._lock:
+            row = self._table.index_of(post_id)
+            if row is None:
+                return None
+            value = self._table.get(row, field) + by
+            self._log({"op": "set", "id": post_id, "field": field, "value": value})
+            self._table.set(row, field, value)
+            post = self._table.row(row)
+            self._emit("increment", post, field=field, by=by)
+            return post
+
+    def add_comment(self, post_id, comment):
+        with self._lock:
+            if self._table.index_of(post_id) is None:
+                return None
+            append_comment(post_id, comment)
+            post = self.increment(post_id, 'comment_count')
+            self._emit("comment", post, comment=comment)
+            return post
+
+    # 카운터가 아닌 필드 설정 (예: duplicate_of)
+    def set_field(self, post_id, field, value):
+        with self._lock:
+            row = self._table.index_of(post_id)
+            if row is None:
+                return None
+            self._log({"op": "set", "id": post_id, "field": field, "value": value})
+            self._table.set(row, field, value)
+            post = self._table.row(row)
+            self._emit("update", post, field=field, value=value)
+            return post
+
+    # 대기 중인 변경을 즉시 파일에 반영 (파일 쓰기 중에도 변경은 계속 받음)
+    # writer/close/compact/remove가 동시에 불러도 _flush_lock으로 차례대로 실행
+    # → 같은 임시 파일을 함께 쓰거나, 먼저 뜬 스냅샷이 저널을 비운 뒤의 새 파일을 덮어쓰지 않음
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty or self.read_only or self._journal.closed:
+                    return
+                table = self._table.copy()
+                mark = self._journal.tell()
+                self._dirty = False
+            try:
+                write_posts_stream(table.rows(), self.path)   # 글 dict는 하나씩 만들어 바로 씀
+            except OSError:
+                self._dirty = True
+                raise
+            with self._lock:
+                # 쓰는 동안 새 기록이 없을 때만 저널 비움 (남은 기록은 재생해도 안전)
+                if self._journal.tell() == mark:
+                    self._journal.truncate(0)
+                    self._journal.seek(0)
+        self._emit("flush", None)
+
+    # 작성 시각이 cutoff(epoch) 이전인 글을 저장소에서 떼어냄 (보관 계층으로 옮기기, post_archive.py)
+    # keep(posts)로 먼저 다른 곳에 저장한 뒤 게시글 파일을 다시 씀 → 중간에 실패해도 글이 사라지지 않음
+    def detach_older_than(self, cutoff, keep):
+        with self._lock:
+            table = self._table
+            old = {i for i in range(len(table)) if 0 < table.ts[i] < cutoff}
+            if not old:
+                return []
+            posts = [table.row(i) for i in sorted(old)]
+            keep(posts)
+            self._drop_rows(old)
+            for post in posts:
+                self._emit("remove", post, archived=True)
+        self.flush()
+        return posts
+
+    # 글 삭제 (중복 정리 배치용, near_dup.py) → 삭제한 글 목록
+    def remove(self, post_ids):
+        with self._lock:
+            rows = {self._table.index_of(post_id) for post_id in post_ids} - {None}
+            if not rows:
+                return []
+            posts = [self._table.row(i) for i in sorted(rows)]
+            self._drop_rows(rows)
+            for post in posts:
+                self._emit("remove", post, archived=False)
+        self.flush()
+        return posts
+
+    # lock 안에서 호출: rows를 뺀 새 테이블로 교체 (파일은 다음 flush에 다시 씀)
+    def _drop_rows(self, rows):
+        table = self._table
+        remaining = PostTable()
+        for i in range(len(table)):
+            if i not in rows:
+                remaining.append(table.row(i))
+        self._table = remaining
+        self._dirty = True
+
+    # 변경이 없어도 현재 상태로 파일을 새로 쓰고 저널을 비움 (배치 정리용)
+    def compact(self):
+        with self._lock:
+            self._dirty = True
+        self.flush()
+
+    # flush=False: 파일/저널을 건드리지 않고 닫기 (검사 등 읽기 전용으로 열었을 때)
+    def close(self, flush=True):
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wakeup.set()
+        self._writer.join(timeout=10)
+        if flush:
+            self.flush()
+        with self._flush_lock:   # join 시간이 지나도 writer가 쓰는 중이면 끝날 때까지 기다림
+            self._journal.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+    def _log(self, record):
+        if self.read_only:
+            raise StoreLocked(f"읽기 전용으로 연 저장소: {self.path}")
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._dirty = True
+        self._wakeup.set()
+
+    def _apply_add(self, post):
+        if self._table.index_of(post['id']) is None:
+            self._table.append(post)
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # 마지막 줄이 쓰이다 만 경우
+                if record["op"] == "add":
+                    self._apply_add(record["post"])
+                elif record["op"] == "set":
+                    row = self._table.index_of(record["id"])
+                    if row is not None:
+                        self._table.set(row, record["field"], record["value"])
+                self._dirty = True
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait()
+            if self._stopped:
+                break
+            # 첫 변경 이후 flush_interval 동안 들어온 변경을 모아서 한 번에 저장
+            time.sleep(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except OSError:
+                pass  # 다음 주기에 재시도 (저널에는 남아 있음)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+# 프로세스 전체(모든 세션)가 공유하는 저장소
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PostStore()
+        return _store
@@ -0,0 +1,175 @@
+# 일봉 시세 이력 + 가치 판단용 가격 밴드 (52주 최고/최저, 이동평균, 1년 종가 백분위)
+#  - 네이버 일별 시세 페이지(10일/페이지)에서 아직 없는 날짜만 여러 페이지씩 묶어 받아 종목별 파일에 누적
+#    (백그라운드 전용 요청 한도 사용 → 화면의 시세 조회와 토큰을 나눠 쓰지 않음)
+#  - 장이 끝나 확정된 일봉만 저장하고, 밴드는 NumPy로 계산해 종목별·거래일별로 캐시
+#    → 같은 거래일 안에서는 rerun마다 요청/계산하지 않음
+import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+from bs4 import BeautifulSoup
+
+import krx_calendar
+import quote_service
+
+NAVER_DAY_URL = "https://finance.naver.com/item/sise_day.naver?code={code}&page={page}"
+HISTORY_DIR = "price_history"   # 종목별 <코드>.npz
+HISTORY_DAYS = 300              # 처음 받을 때 채우는 거래일 수 (120일선 + 52주)
+MAX_DAYS = 600                  # 파일에 보관하는 최대 거래일 수
+YEAR_DAYS = 250                 # 52주 ≈ 250거래일
+ROWS_PER_PAGE = 10
+PAGE_BATCH = 5                  # 한 번에 동시에 받는 페이지 수
+MOVING_AVERAGES = (20, 60, 120)
+FIELDS = ("date", "open", "high", "low", "close", "volume")   # date = YYYYMMDD 정수
+
+Bands = namedtuple("Bands", "day high_52w low_52w ma20 ma60 ma120 p10 p50 p90 position")
+
+_DATE = re.compile(r"^\d{4}\.\d{2}\.\d{2}$")
+
+
+# 일별 시세 페이지 HTML → [(date, open, high, low, close, volume), ...] (최근 날짜부터)
+def parse_day_page(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    rows = []
+    for tr in soup.select("table.type2 tr"):
+        cells = [td.get_text(strip=True) for td in tr.find_all("td")]
+        if len(cells) < 7 or not _DATE.match(cells[0]):
+            continue
+        try:
+            close, open_, high, low, volume = (int(cells[i].replace(",", "")) for i in (1, 3, 4, 5, 6))
+        except ValueError:
+            continue
+        rows.append((int(cells[0].replace(".", "")), open_, high, low, close, volume))
+    return rows
+
+
+def fetch_day_page(stock_code, page):
+    html = quote_service.http_get_text(NAVER_DAY_URL.format(code=stock_code, page=page), f"{stock_code}_day_{page}",
+                                       max_wait=quote_service.BATCH_RATE_MAX_WAIT, background=True)
+    return parse_day_page(html)
+
+
+# ----- 종목별 이력 파일 -----
+def history_path(stock_code):
+    return os.path.join(HISTORY_DIR, f"{stock_code}.npz")
+
+# 이력 파일이 있으면 빠진 날짜만 받으면 됨 (보통 1페이지), 없으면 HISTORY_DAYS만큼 처음부터
+def has_history(stock_code):
+    return os.path.exists(history_path(stock_code))
+
+def _empty_history():
+    return {field: np.zeros(0, dtype=np.int64) for field in FIELDS}
+
+# → (이력 배열 dict, 마지막으로 채운 기준 거래일 YYYYMMDD 또는 0)
+def load_history(stock_code):
+    path = history_path(stock_code)
+    if not os.path.exists(path):
+        return _empty_history(), 0
+    with np.load(path) as data:
+        return {field: data[field] for field in FIELDS}, int(data["closed_day"])
+
+def save_history(stock_code, history, closed_day):
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    tmp = history_path(stock_code) + ".tmp"
+    with open(tmp, 'wb') as f:
+        np.savez(f, closed_day=np.int64(closed_day), **history)
+    os.replace(tmp, history_path(stock_code))
+
+
+# 기존 이력 이후 ~ closed_day 까지의 빠진 날짜를 받아 채움 → (이력, 새로 추가한 일수)
+# 이력이 있으면 1페이지만 먼저 받고(보통 여기서 끝남), 모자라거나 처음이면 PAGE_BATCH 페이지씩 동시에
+def fill_history(stock_code, history, closed_day):
+    last = int(history["date"][-1]) if history["date"].size else 0
+    max_pages = -(-HISTORY_DAYS // ROWS_PER_PAGE)
+    new_rows, page = [], 1
+    batch = 1 if last else PAGE_BATCH
+    with ThreadPoolExecutor(max_workers=PAGE_BATCH) as pool:
+        while page <= max_pages:
+            pages = list(pool.map(lambda p: fetch_day_page(stock_code, p), range(page, page + batch)))
+            page += batch
+            batch = PAGE_BATCH
+            rows = [r for rows in pages for r in rows]
+            new_rows += [r for r in rows if last < r[0] <= closed_day]   # 장중인 오늘 일봉은 제외
+            if not rows or min(r[0] for r in rows) <= last or any(not rows for rows in pages):
+                break
+    if not new_rows:
+        return history, 0
+    added = np.array(sorted(set(new_rows)), dtype=np.int64)
+    merged = {field: np.concatenate([history[field], added[:, i]])[-MAX_DAYS:] for i, field in enumerate(FIELDS)}
+    return merged, len(added)
+
+
+# ----- 밴드 계산 -----
+def compute_bands(history, day=0):
+    valid = history["close"] > 0   # 거래정지일 등 0으로 찍힌 날 제외
+    close = history["close"][valid][-YEAR_DAYS:]
+    if close.size == 0:
+        return None
+    high = history["high"][valid][-YEAR_DAYS:]
+    low = history["low"][valid][-YEAR_DAYS:]
+    mas = [int(round(close[-n:].mean())) if close.size >= n else None for n in MOVING_AVERAGES]
+    p10, p50, p90 = (int(round(v)) for v in np.percentile(close, [10, 50, 90]))
+    position = int(round((close <= close[-1]).mean() * 100))   # 마지막 종가의 1년 종가 백분위
+    low_52w = int(low[low > 0].min()) if (low > 0).any() else int(close.min())
+    return Bands(day, int(high.max()), low_52w, *mas, p10, p50, p90, position)
+
+
+def _day_key(now=None):
+    return int(krx_calendar.last_closed_day(now).strftime("%Y%m%d"))
+
+
+class BandCache:
+    def __init__(self, workers=4):
+        self._lock = threading.Lock()
+        self._bands = {}       # code -> Bands (Bands.day = 기준 거래일)
+        self._code_locks = {}  # 같은 종목을 동시에 두 번 받지 않도록
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="price-history")
+
+    def _code_lock(self, stock_code):
+        with self._lock:
+            return self._code_locks.setdefault(stock_code, threading.Lock())
+
+    # 오늘 기준으로 계산된 밴드만 (없으면 None, I/O 없음)
+    def peek(self, stock_code):
+        bands = self._bands.get(stock_code)
+        return bands if bands is not None and bands.day == _day_key() else None
+
+    # 필요하면 파일 읽기/빠진 날짜 받기까지 하고 밴드 반환
+    def get(self, stock_code):
+        day = _day_key()
+        with self._code_lock(stock_code):
+            bands = self._bands.get(stock_code)
+            if bands is not None and bands.day == day:
+                return bands
+            history, closed_day = load_history(stock_code)
+            if closed_day != day:
+                history, added = fill_history(stock_code, history, day)
+                if added:   # 아무것도 못 받았으면 채운 날로 기록하지 않음 → 다음 조회 때 다시 시도
+                    save_history(stock_code, history, day)
+            bands = compute_bands(history, day)
+            if bands is not None:
+                self._bands[stock_code] = bands
+            return bands
+
+    # 백그라운드로 계산 시작 → {code: Future} (이미 계산된 종목은 바로 완료된 Future)
+    def prefetch(self, stock_codes):
+        futures = {}
+        for code in dict.fromkeys(c for c in stock_codes if c):
+            bands = self.peek(code)
+            if bands is not None:
+                futures[code] = Future()
+                futures[code].set_result(bands)
+            else:
+                futures[code] = self._pool.submit(self.get, code)
+        return futures
+
+
+# 프로세스 공용 (모든 세션이 공유)
+band_cache = BandCache()
+
+def get_bands(stock_code): return band_cache.get(stock_code)
+def peek_bands(stock_code): return band_cache.peek(stock_code)
+def prefetch(stock_codes): return band_cache.prefetch(stock_codes)
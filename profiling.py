@@ -0,0 +1,47 @@
+# 스크립트 1회 실행(rerun) 단위 프로파일링 (cProfile)
+# 결과는 PROFILE_DIR/<시각>_<사용자>_<탭>_<동작>.prof 로 저장
+#  → snakeviz profiles/xxx.prof 로 호출 트리/아이시클 그래프 확인, 또는 pstats로 직접 조회
+import cProfile
+import os
+import pstats
+import re
+from datetime import datetime
+
+PROFILE_DIR = os.environ.get("APP_PROFILE_DIR", "profiles")
+TOP_N = 15
+
+
+def _slug(text):
+    return re.sub(r"[^\w-]+", "_", text).strip("_") or "none"
+
+
+# fn()을 프로파일링하며 실행. 예외(st.rerun 포함)가 나도 결과는 저장하고 그대로 다시 올림
+def profile_run(fn, user, tab, action, on_done=None):
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        return fn()
+    finally:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(PROFILE_DIR, f"{stamp}_{_slug(user)}_{_slug(tab)}_{_slug(action)}.prof")
+        profiler.dump_stats(path)
+        if on_done is not None:
+            on_done(path)
+
+
+# 저장된 프로파일 → 누적 시간 상위 함수 목록
+def top_functions(path, n=TOP_N, sort="cumulative"):
+    stats = pstats.Stats(path)
+    total = stats.total_tt
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in sorted(
+            stats.stats.items(), key=lambda kv: kv[1][3 if sort == "cumulative" else 2], reverse=True)[:n]:
+        rows.append({
+            "함수": f"{func} ({os.path.basename(filename)}:{line})",
+            "호출 수": nc,
+            "자체(ms)": round(tt * 1000, 2),
+            "누적(ms)": round(ct * 1000, 2),
+        })
+    return total, rows
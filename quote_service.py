@@ -0,0 +1,423 @@
+# 네이버 증권 시세 조회 계층 (Streamlit 비의존 → CLI/배치에서도 재사용)
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+
+import krx_calendar
+
+NAVER_ITEM_URL = "https://finance.naver.com/item/main.nhn?code={code}"
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
+REQUEST_TIMEOUT = 10
+# 캐시 유지 시간은 KRX 장 운영 시간 기준 (장중 짧게, 장 마감 후엔 다음 개장까지)
+quote_ttl = krx_calendar.quote_ttl
+CACHE_MAX_ENTRIES = int(os.environ.get("QUOTE_CACHE_MAX_ENTRIES", "1000"))   # 넘으면 가장 오래 안 쓴 종목부터 제거
+NEGATIVE_TTL = float(os.environ.get("QUOTE_NEGATIVE_TTL", "60"))   # 없는 종목/파싱 실패 결과를 기억하는 시간(초)
+
+# 업스트림 보호 설정 (호스트 단위)
+RATE_PER_SEC = 5          # 초당 허용 요청 수
+RATE_BURST = 10           # 순간 최대 요청 수
+RATE_MAX_WAIT = 1.0       # 토큰을 기다리는 최대 시간(초), 넘으면 즉시 실패
+BATCH_RATE_MAX_WAIT = 30  # 일괄 갱신은 한도 안에서 차례를 기다림
+BATCH_WORKERS = 8         # 일괄 갱신 동시 요청 수
+BACKGROUND_RATE_PER_SEC = 2   # 백그라운드 작업(일봉 이력 채우기 등)은 별도의 더 낮은 한도로
+BACKGROUND_RATE_BURST = 4     # → 대량으로 받아도 화면용 시세 요청의 토큰을 쓰지 않음
+BREAKER_THRESHOLD = 3     # 연속 실패 횟수 → 차단
+BREAKER_COOLDOWN = 60     # 차단 유지 시간(초), 이후 1건만 시험 요청
+
+# HTTP 기록/재생 모드 (네트워크 없이 테스트/벤치마크/CI 실행용)
+#  - live: 네이버에 직접 요청 (기본값)
+#  - record: 직접 요청하고 응답 HTML을 FIXTURES_DIR/<이름>.html로 저장
+#  - replay: 네트워크 없이 저장된 HTML을 돌려줌 (REPLAY_LATENCY_MS ± REPLAY_JITTER_MS 만큼 지연)
+HTTP_MODES = ("live", "record", "replay")
+HTTP_MODE = os.environ.get("QUOTE_HTTP_MODE", "live")
+FIXTURES_DIR = os.environ.get("QUOTE_FIXTURES_DIR", os.path.join("fixtures", "quotes"))
+REPLAY_LATENCY_MS = float(os.environ.get("QUOTE_REPLAY_LATENCY_MS", "0"))
+REPLAY_JITTER_MS = float(os.environ.get("QUOTE_REPLAY_JITTER_MS", "0"))
+
+
+# 업스트림을 호출하지 않고 바로 실패시킨 경우 (차단 중/요청 한도 초과)
+class UpstreamUnavailable(requests.exceptions.RequestException):
+    pass
+
+
+# 토큰 버킷 요청 제한기
+class TokenBucket:
+    def __init__(self, rate=RATE_PER_SEC, burst=RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait=RATE_MAX_WAIT):
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+# 서킷 브레이커: closed → (연속 실패) open → (쿨다운 후) half-open 시험 1건 → closed/open
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half-open"
+            if self.state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == "half-open" or self._failures >= self.threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class _HostGuard:
+    def __init__(self):
+        self.bucket = TokenBucket()
+        self.background_bucket = TokenBucket(BACKGROUND_RATE_PER_SEC, BACKGROUND_RATE_BURST)
+        self.breaker = CircuitBreaker()
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def _guard_for(url):
+    host = urlsplit(url).netloc
+    with _guards_lock:
+        guard = _guards.get(host)
+        if guard is None:
+            guard = _guards[host] = _HostGuard()
+    return guard
+
+
+# 호스트별 요청 제한 + 서킷 브레이커를 거친 GET (background=True면 백그라운드용 토큰 버킷 사용, 브레이커는 공유)
+def guarded_get(url, max_wait=RATE_MAX_WAIT, background=False, **kwargs):
+    guard = _guard_for(url)
+    if not guard.breaker.allow():
+        raise UpstreamUnavailable(f"circuit open: {urlsplit(url).netloc}")
+    bucket = guard.background_bucket if background else guard.bucket
+    if not bucket.acquire(max_wait):
+        if guard.breaker.state == "half-open":
+            guard.breaker.record_failure()
+        raise UpstreamUnavailable(f"rate limited: {urlsplit(url).netloc}")
+    # 어떤 예외로 끝나든 결과를 기록해야 half-open 시험 요청 상태가 풀림
+    ok = False
+    try:
+        response = requests.get(url, **kwargs)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        ok = True
+    finally:
+        if ok:
+            guard.breaker.record_success()
+        else:
+            guard.breaker.record_failure()
+    return response
+
+
+# 재생할 기록이 없는 경우
+class FixtureMissing(requests.exceptions.RequestException):
+    pass
+
+
+def set_http_mode(mode, fixtures_dir=None, latency_ms=None, jitter_ms=None):
+    global HTTP_MODE, FIXTURES_DIR, REPLAY_LATENCY_MS, REPLAY_JITTER_MS
+    if mode not in HTTP_MODES:
+        raise ValueError(f"알 수 없는 모드: {mode} (가능: {', '.join(HTTP_MODES)})")
+    HTTP_MODE = mode
+    if fixtures_dir is not None: FIXTURES_DIR = fixtures_dir
+    if latency_ms is not None: REPLAY_LATENCY_MS = latency_ms
+    if jitter_ms is not None: REPLAY_JITTER_MS = jitter_ms
+
+
+def fixture_path(name):
+    return os.path.join(FIXTURES_DIR, f"{name}.html")
+
+
+# 모드에 따라 실제 요청/기록/재생 → 응답 본문(HTML)
+def http_get_text(url, fixture_name, max_wait=RATE_MAX_WAIT, background=False):
+    if HTTP_MODE == "replay":
+        path = fixture_path(fixture_name)
+        if not os.path.exists(path):
+            raise FixtureMissing(f"기록 없음: {path}")
+        delay = REPLAY_LATENCY_MS + random.uniform(-REPLAY_JITTER_MS, REPLAY_JITTER_MS)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    response = guarded_get(url, max_wait=max_wait, background=background, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    if HTTP_MODE == "record":
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        tmp = fixture_path(fixture_name) + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        os.replace(tmp, fixture_path(fixture_name))
+    return response.text
+
+
+# HTML → {'price', 'change', 'change_rate', 'updated_at'} (현재가를 못 찾으면 None)
+def parse_quote(html):
+    soup = BeautifulSoup(html, 'html.parser')
+
+    current_price = None
+    price_element = soup.select_one('.no_today .blind')
+    if price_element:
+        price_text = price_element.text.strip()
+        price_numbers = ''.join(c for c in price_text if c.isdigit() or c == ',')
+        if price_numbers:
+            current_price = int(price_numbers.replace(',', ''))
+    if current_price is None:
+        blind_elements = soup.select('.blind')
+        for element in blind_elements:
+            text = element.text.strip()
+            numbers_only = ''.join(c for c in text if c.isdigit() or c == ',')
+            if numbers_only and len(numbers_only) >= 3:
+                try:
+                    current_price = int(numbers_only.replace(',', ''))
+                    break
+                except:
+                    continue
+    if current_price is None:
+        return None
+
+    change = 0
+    change_rate = 0.0
+    blind_elements = soup.select('.blind')
+    for i, element in enumerate(blind_elements):
+        text = element.text.strip()
+        if i > 0 and i < len(blind_elements) - 1:
+            numbers_only = ''.join(c for c in text if c.isdigit() or c == ',')
+            if numbers_only and len(numbers_only) <= 6:
+                try:
+                    change_value = int(numbers_only.replace(',', ''))
+                    if change_value > 0 and change_value < current_price:
+                        change = change_value
+                        parent_text = str(element.parent) if element.parent else ""
+                        if 'minus' in parent_text or 'down' in parent_text.lower():
+                            change = -change
+                        break
+                except:
+                    continue
+    for element in blind_elements:
+        text = element.text.strip()
+        if '%' in text:
+            try:
+                rate_text = text.replace('%', '').replace('+', '').replace('-', '').strip()
+                change_rate = float(rate_text)
+                change_rate = -abs(change_rate) if change < 0 else abs(change_rate)
+                break
+            except:
+                continue
+
+    return {
+        'price': current_price,
+        'change': change,
+        'change_rate': change_rate,
+        'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+# 실제 업스트림 호출 (네트워크 오류/차단은 requests 예외로 그대로 올림, 없는 종목이면 None)
+def fetch_quote(stock_code, max_wait=RATE_MAX_WAIT):
+    try:
+        html = http_get_text(NAVER_ITEM_URL.format(code=stock_code), stock_code, max_wait=max_wait)
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return None
+        raise
+    return parse_quote(html)
+
+
+# 종목별 진행 중인 업스트림 요청 1건 (대기자들이 같은 결과를 공유)
+class _Flight:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# single-flight + stale-while-revalidate 시세 캐시
+#  - 만료 직후 여러 세션이 동시에 miss 해도 종목당 업스트림 요청은 1건
+#  - 옛 값이 있으면 즉시 돌려주고(stale=True 표시) 갱신은 백그라운드에서 1건만 수행
+#  - 업스트림 장애로 갱신이 실패해도 마지막으로 받은 값은 계속 유지
+#  - 만료 시각은 받을 때마다 ttl_policy()로 정함 (숫자를 주면 고정 TTL)
+#  - 최대 max_entries개 종목까지 LRU로 유지 (아무 코드나 조회해도 메모리가 무한히 늘지 않음)
+#  - 없는 종목/파싱 실패(fetcher가 None)는 negative_ttl초 동안 None으로 기억 → 잘못된 코드 재시도에 업스트림 호출 없음
+class QuoteCache:
+    def __init__(self, fetcher, ttl_policy=quote_ttl, refresh_workers=4,
+                 max_entries=CACHE_MAX_ENTRIES, negative_ttl=NEGATIVE_TTL):
+        self._fetcher = fetcher
+        self._ttl_policy = ttl_policy if callable(ttl_policy) else (lambda: ttl_policy)
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # code -> (quote 또는 None, expires_at), 최근 사용한 종목이 뒤
+        self._inflight = {}   # code -> _Flight
+        self._counts = dict.fromkeys(("hits", "stale_hits", "negative_hits", "misses", "evictions"), 0)
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="quote-refresh")
+
+    # fetch_kwargs는 업스트림 호출 시 fetcher에 그대로 전달 (예: max_wait)
+    def get(self, stock_code, **fetch_kwargs):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(stock_code)
+            if entry is not None:
+                self._entries.move_to_end(stock_code)
+                if now < entry[1]:
+                    self._counts["hits" if entry[0] is not None else "negative_hits"] += 1
+                    return entry[0]
+                if entry[0] is None:
+                    entry = None   # 만료된 negative 항목은 없는 것과 같음
+            self._counts["stale_hits" if entry is not None else "misses"] += 1
+            flight = self._inflight.get(stock_code)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[stock_code] = flight
+
+        if entry is not None:
+            if leader:
+                self._refresher.submit(self._run, stock_code, flight, fetch_kwargs)
+            return dict(entry[0], stale=True)
+
+        if leader:
+            self._run(stock_code, flight, fetch_kwargs)
+        else:
+            flight.event.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    # 캐시에 남아있는 값만 조회 (업스트림 호출 없음)
+    def peek(self, stock_code):
+        with self._lock:
+            entry = self._entries.get(stock_code)
+        return entry[0] if entry else None
+
+    # 만료되지 않은 값만 조회 (없으면 None)
+    def fresh(self, stock_code):
+        with self._lock:
+            entry = self._entries.get(stock_code)
+        return entry[0] if entry is not None and time.monotonic() < entry[1] else None
+
+    # {hits, stale_hits, negative_hits, misses, evictions, size, max_entries}
+    def stats(self):
+        with self._lock:
+            return dict(self._counts, size=len(self._entries), max_entries=self.max_entries)
+
+    def _run(self, stock_code, flight, fetch_kwargs):
+        try:
+            flight.result = self._fetcher(stock_code, **fetch_kwargs)
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                if flight.result is not None:
+                    self._store(stock_code, flight.result, self._ttl_policy())
+                elif flight.error is None and (self._entries.get(stock_code) or (None,))[0] is None:
+                    self._store(stock_code, None, self.negative_ttl)   # 마지막 정상 시세가 있으면 그대로 유지
+                self._inflight.pop(stock_code, None)
+            flight.event.set()
+
+    # lock 안에서 호출
+    def _store(self, stock_code, quote, ttl):
+        self._entries[stock_code] = (quote, time.monotonic() + ttl)
+        self._entries.move_to_end(stock_code)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counts["evictions"] += 1
+
+
+# 프로세스 전체(모든 세션)가 공유하는 캐시
+quote_cache = QuoteCache(fetch_quote)
+
+
+def get_quote(stock_code):
+    return quote_cache.get(stock_code)
+
+
+# 여러 종목을 동시에 조회 → ({code: quote 또는 None}, {code: 예외})
+# 관심 기업이 수십~수백 개여도 종목당 1번, 최대 BATCH_WORKERS개씩 병렬로 요청
+def get_quotes(stock_codes, max_workers=BATCH_WORKERS):
+    codes = list(dict.fromkeys(c for c in stock_codes if c))
+    quotes, errors = {}, {}
+    if not codes:
+        return quotes, errors
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(codes)), thread_name_prefix="quote-batch") as pool:
+        futures = {code: pool.submit(quote_cache.get, code, max_wait=BATCH_RATE_MAX_WAIT) for code in codes}
+        for code, future in futures.items():
+            try:
+                quotes[code] = future.result()
+            except Exception as e:
+                quotes[code] = None
+                errors[code] = e
+    return quotes, errors
+
+
+# 받은 시세를 관심 기업 레코드에 반영 (앱/CLI 공용)
+def apply_quote(company, stock_info):
+    company["current_price"] = stock_info['price']
+    company["last_updated"] = stock_info['updated_at']
+    company["change"] = stock_info['change']
+    company["change_rate"] = stock_info['change_rate']
+    company["price_stale"] = stock_info.get('stale', False)
+
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="quote-prefetch")
+
+# 백그라운드로 미리 조회 시작 → {code: Future} (캐시가 살아있는 종목은 바로 완료된 Future)
+# 같은 종목을 이미 누가 조회 중이면 single-flight로 그 결과를 함께 기다림
+def prefetch(stock_codes):
+    futures = {}
+    for code in dict.fromkeys(c for c in stock_codes if c):
+        quote = quote_cache.fresh(code)
+        if quote is not None:
+            futures[code] = Future()
+            futures[code].set_result(quote)
+        else:
+            futures[code] = _prefetch_pool.submit(quote_cache.get, code, max_wait=BATCH_RATE_MAX_WAIT)
+    return futures
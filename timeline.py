@@ -0,0 +1,141 @@
+# 팔로우 기반 개인 타임라인 (fan-out-on-write)
+#  - 글이 저장되면 작성자 본인과 팔로워들의 타임라인에 (시각, 글 id)를 넣고, 사용자마다 최근 TIMELINE_CAP개만 유지
+#  - 팔로워가 FANOUT_LIMIT명을 넘는 작성자는 미리 넣지 않고 읽을 때 그 작성자의 최근 글을 합침 (merge-on-read)
+#  - 타임라인 조회 = SQLite 인덱스 범위 조회 + 글 id로 저장소 조회 → 전체 글 수와 무관
+#  - 저장소 lock 안에서 호출되는 listener는 큐에 넣기만 하고, SQLite 쓰기는 백그라운드 스레드가 처리
+#  - 타임라인이 생기기 전에 쓴 본인 글은 처음 피드를 열 때 작성자별 글 목록에서 채움
+import atexit
+import json
+import logging
+import queue
+import threading
+
+import user_store
+from post_store import to_epoch
+
+TIMELINE_CAP = 500     # 사용자별 보관하는 타임라인 글 수
+FANOUT_LIMIT = 1000    # 팔로워가 이보다 많으면 fan-out 대신 merge-on-read
+
+log = logging.getLogger(__name__)
+
+_own_filled = set()    # 이 프로세스에서 본인 글을 이미 채운 사용자
+
+
+# 글 id는 예전 글의 int와 uuid 문자열이 섞여 있어 JSON으로 저장 (조회 시 원래 타입으로 복원)
+def _encode(post_id):
+    return json.dumps(post_id)
+
+def _decode(text):
+    return json.loads(text)
+
+
+# 새 글 1개를 작성자 타임라인 + (팔로워가 적으면) 팔로워 타임라인에 넣음
+def fan_out(author, ts, post_id):
+    encoded = _encode(post_id)
+    user_store.add_author_posts([(author, ts, encoded)])
+    targets = [author]
+    if user_store.follower_count(author) <= FANOUT_LIMIT:
+        targets += user_store.followers(author)
+    user_store.timeline_add(targets, [(ts, encoded, author)], TIMELINE_CAP)
+
+
+class Fanout:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="timeline-fanout", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    # 저장소 이벤트 구독용
+    def __call__(self, event, post, **details):
+        if event == "post" and post.get('author'):
+            self._queue.put((post['author'], to_epoch(post.get('timestamp')) or 0, post['id']))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                fan_out(*item)
+            except Exception:
+                # DB 잠김/잘못된 글 등으로 실패한 글만 건너뛰고 worker는 계속 실행
+                # (빠진 글은 python cli.py rebuild timeline 으로 복구)
+                log.exception("timeline fan-out 실패: %r", item)
+            finally:
+                self._queue.task_done()
+
+    # 남은 fan-out을 마저 처리 (프로세스 종료 시)
+    def close(self):
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join(timeout=10)
+
+
+# 저장소에 연결: 작성자별 글 목록이 비어 있거나 모자라면 현재 글로 채운 뒤 새 글을 구독
+def attach(store):
+    fanout = Fanout()
+    with store.lock:
+        table = store.table
+        if user_store.author_post_count() < len(table):
+            user_store.add_author_posts([(table.author[i], table.ts[i], _encode(table.ids[i]))
+                                         for i in range(len(table)) if table.author[i]])
+        store.subscribe(fanout)
+    return fanout
+
+
+# 팔로우 관계 + 작성자별 글 목록으로 모든 타임라인을 다시 만듦 (fan-out 누락 복구용) → 사용자 수
+def rebuild(store):
+    with store.lock:
+        table = store.table
+        user_store.add_author_posts([(table.author[i], table.ts[i], _encode(table.ids[i]))
+                                     for i in range(len(table)) if table.author[i]])
+    user_store.clear_timelines()
+    n_users = 0
+    for username, _ in user_store.iter_users():
+        authors = [username] + [a for a in user_store.following(username) if user_store.follower_count(a) <= FANOUT_LIMIT]
+        entries = [(ts, post_id, author) for author in authors for ts, post_id in user_store.author_posts(author, TIMELINE_CAP)]
+        if entries:
+            user_store.timeline_add([username], entries, TIMELINE_CAP)
+        n_users += 1
+    return n_users
+
+
+# ----- 팔로우 -----
+# 팔로우하면 그 사람의 최근 글을 내 타임라인에 바로 채움 (merge-on-read 대상이면 읽을 때 합쳐지므로 생략)
+def follow(username, author):
+    if username == author or not user_store.follow(username, author):
+        return False
+    if user_store.follower_count(author) <= FANOUT_LIMIT:
+        entries = [(ts, post_id, author) for ts, post_id in user_store.author_posts(author, TIMELINE_CAP)]
+        user_store.timeline_add([username], entries, TIMELINE_CAP)
+    return True
+
+def unfollow(username, author):
+    if not user_store.unfollow(username, author):
+        return False
+    user_store.timeline_remove_author(username, author)
+    return True
+
+def following(username):
+    return set(user_store.following(username))
+
+
+# 작성자 본인의 기존 글을 본인 타임라인에 넣음 (프로세스당 사용자별 1번, 이미 있는 글은 무시 → 동시에 불려도 안전)
+def fill_own_posts(username):
+    if username in _own_filled:
+        return
+    entries = [(ts, post_id, username) for ts, post_id in user_store.author_posts(username, TIMELINE_CAP)]
+    if entries:
+        user_store.timeline_add([username], entries, TIMELINE_CAP)
+    _own_filled.add(username)
+
+
+# 최근 n개 글 id (내 타임라인 + 팔로워가 많은 작성자의 최근 글)
+def timeline_ids(username, n=50):
+    fill_own_posts(username)
+    rows = user_store.timeline(username, n)
+    for author in user_store.following_over(username, FANOUT_LIMIT):
+        rows += user_store.author_posts(author, n)
+    rows = sorted(set(rows), reverse=True)[:n]
+    return [_decode(post_id) for _, post_id in rows]
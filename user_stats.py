@@ -0,0 +1,180 @@
+# 사용자별 활동 통계 (게시글 저장소 변경 시 증분 갱신)
+#  - 작성 글 수, 받은 좋아요/리트윗, 작성 댓글 수, 가장 많이 리서치한 기업
+#  - 사용자 통계 조회는 dict 1회, 리더보드는 점수순 정렬 리스트를 유지해 상위 N개를 바로 슬라이스
+import argparse
+import json
+import os
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+import post_archive
+import post_store
+from post_store import COUNTER_FIELDS
+
+STATS_FILE = "user_stats_v2.json"
+# 리더보드 점수 가중치
+SCORE_WEIGHTS = {"posts": 5, "likes_received": 1, "retweets_received": 2, "comments_made": 1}
+
+
+def _empty():
+    return {"posts": 0, "likes_received": 0, "retweets_received": 0, "comments_made": 0, "companies": Counter()}
+
+
+# 게시글 저장소 상태 요약 [글 수, 좋아요, 리트윗, 댓글 수 합계] (스냅샷이 현재 데이터와 맞는지 확인용)
+def store_fingerprint(table):
+    return [len(table)] + [sum(getattr(table, field)) for field in COUNTER_FIELDS]
+
+
+class UserStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = {}
+        self._board = []      # (-score, username) 오름차순 = 점수 내림차순
+        self._scores = {}
+        self.fingerprint = None
+
+    def __len__(self):
+        return len(self._users)
+
+    # 저장소 이벤트 구독용
+    def __call__(self, event, post, **details):
+        if event == "post":
+            self.fingerprint[0] += 1
+            self._add(post['author'], posts=1, company=post.get('company'))
+        elif event == "increment":
+            self.fingerprint[1 + COUNTER_FIELDS.index(details['field'])] += details['by']
+            if details['field'] in ('likes', 'retweets'):
+                self._add(post['author'], **{f"{details['field']}_received": details['by']})
+        elif event == "comment":
+            self._add(details['comment']['author'], comments_made=1)
+        elif event == "remove":
+            self.fingerprint[0] -= 1
+            for i, field in enumerate(COUNTER_FIELDS, start=1):
+                self.fingerprint[i] -= post.get(field, 0)
+            if not details['archived']:   # 보관된 글은 계속 통계에 포함
+                self._remove_post(post)
+        elif event == "flush":
+            self.save()
+
+    def _add(self, username, posts=0, likes_received=0, retweets_received=0, comments_made=0, company=None):
+        if not username:
+            return
+        with self._lock:
+            stats = self._users.setdefault(username, _empty())
+            stats["posts"] += posts
+            stats["likes_received"] += likes_received
+            stats["retweets_received"] += retweets_received
+            stats["comments_made"] += comments_made
+            if company:
+                stats["companies"][company] += 1
+            self._rescore(username, stats)
+
+    # 삭제된 글이 더했던 몫을 뺌 (그 글에 달린 댓글 작성 수 포함)
+    def _remove_post(self, post):
+        self._add(post['author'], posts=-1, likes_received=-post.get('likes', 0), retweets_received=-post.get('retweets', 0))
+        if post.get('company') and post['author'] in self._users:
+            with self._lock:
+                companies = self._users[post['author']]["companies"]
+                companies[post['company']] -= 1
+                if companies[post['company']] <= 0:
+                    del companies[post['company']]
+        if post.get('comment_count'):
+            for comment in post_store.load_comments(post['id'], limit=None):
+                self._add(comment.get('author'), comments_made=-1)
+
+    def _rescore(self, username, stats):
+        old = self._scores.get(username)
+        if old is not None:
+            i = bisect_left(self._board, (-old, username))
+            if i < len(self._board) and self._board[i] == (-old, username):
+                self._board.pop(i)
+        score = sum(stats[k] * w for k, w in SCORE_WEIGHTS.items())
+        self._scores[username] = score
+        insort(self._board, (-score, username))
+
+    # ----- 조회 -----
+    def get(self, username, top_companies=3):
+        with self._lock:
+            stats = self._users.get(username)
+            if stats is None:
+                stats = _empty()
+            result = {k: v for k, v in stats.items() if k != "companies"}
+            result["top_companies"] = stats["companies"].most_common(top_companies)
+            result["score"] = self._scores.get(username, 0)
+            return result
+
+    def leaderboard(self, n=10):
+        with self._lock:
+            return [(username, -neg) for neg, username in self._board[:n]]
+
+    # ----- 저장/복원 -----
+    def save(self, path=STATS_FILE):
+        with self._lock:
+            data = {"fingerprint": self.fingerprint,
+                    "users": {u: dict(s, companies=dict(s["companies"])) for u, s in self._users.items()}}
+        tmp = path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def load(self, path=STATS_FILE):
+        if not os.path.exists(path):
+            return False
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        with self._lock:
+            self._users, self._board, self._scores = {}, [], {}
+            for username, stats in data.get("users", {}).items():
+                stats["companies"] = Counter(stats.get("companies", {}))
+                self._users[username] = stats
+                self._rescore(username, stats)
+            self.fingerprint = data.get("fingerprint")
+        return True
+
+    # 전체 게시글/댓글을 훑어 처음부터 다시 계산 (백필용, 보관된 글 포함)
+    # fingerprint는 저장소(최근 글) 기준 그대로 → 다른 프로세스(CLI)의 보관/삭제로 글이 빠지면 다음 연결 때 다시 계산됨
+    def rebuild(self, store):
+        with self._lock:
+            self._users, self._board, self._scores = {}, [], {}
+        with store.lock:
+            table = store.table
+            rows = [(table.ids[i], table.author[i], table.company[i], table.likes[i],
+                     table.retweets[i], table.comment_count[i]) for i in range(len(table))]
+            fingerprint = store_fingerprint(table)
+        rows += [(p['id'], p.get('author'), p.get('company'), p.get('likes', 0), p.get('retweets', 0),
+                  p.get('comment_count', 0)) for p in post_archive.iter_archived()]
+        for post_id, author, company, likes, retweets, n_comments in rows:
+            self._add(author, posts=1, likes_received=likes, retweets_received=retweets, company=company)
+            if n_comments:
+                for comment in post_store.load_comments(post_id, limit=None):
+                    self._add(comment.get('author'), comments_made=1)
+        self.fingerprint = fingerprint
+
+
+# 저장소에 연결: 스냅샷이 현재 데이터와 맞으면 그대로, 아니면 재계산 후 구독
+def attach(store, path=STATS_FILE):
+    stats = UserStats()
+    with store.lock:
+        current = store_fingerprint(store.table)
+        if not (stats.load(path) and stats.fingerprint == current):
+            stats.rebuild(store)
+            stats.save(path)
+        store.subscribe(stats)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="사용자 통계 재계산(백필)")
+    parser.add_argument("--rebuild", action="store_true", help="게시글/댓글 전체를 다시 집계")
+    args = parser.parse_args()
+    if args.rebuild:
+        # 앱이 실행 중이어도 안전하도록 읽기만 하고 닫음 (게시글 파일/저널은 앱이 관리)
+        store = post_store.PostStore(read_only=True)
+        try:
+            stats = UserStats()
+            stats.rebuild(store)
+            stats.save()
+        finally:
+            store.close(flush=False)
+        print(f"{len(stats)}명의 통계를 다시 계산했습니다. → {STATS_FILE}")
@@ -0,0 +1,225 @@
+# 사용자 계정/관심 기업 저장소 (SQLite 키-값, Streamlit 비의존)
+# 사용자 1명을 읽고 쓰는 비용이 전체 사용자 수와 무관하도록 사용자별 레코드(JSON)를 키로 저장
+# 처음 열 때 기존 users_data_v2.json / investment_data_v2.json 내용을 한 번 가져옴
+# 팔로우 관계/개인 타임라인도 같은 DB에 (사용 방식은 timeline.py 참고)
+import json
+import os
+import sqlite3
+import threading
+
+DB_FILE = "app_data_v2.sqlite3"
+USERS_FILE = "users_data_v2.json"
+DATA_FILE = "investment_data_v2.json"
+
+TABLES = {"users": USERS_FILE, "investments": DATA_FILE}
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def _connect(path=DB_FILE):
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conns[path] = conn
+        with _init_lock:
+            if path not in _initialized:
+                _init_schema(conn)
+                _initialized.add(path)
+    return conn
+
+
+def _init_schema(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    for table, json_file in TABLES.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (username TEXT PRIMARY KEY, record TEXT NOT NULL)")
+        _import_json_once(conn, table, json_file)
+    conn.execute("CREATE TABLE IF NOT EXISTS follows (follower TEXT NOT NULL, followee TEXT NOT NULL, "
+                 "PRIMARY KEY (follower, followee)) WITHOUT ROWID")
+    conn.execute("CREATE INDEX IF NOT EXISTS follows_by_followee ON follows (followee, follower)")
+    conn.execute("CREATE TABLE IF NOT EXISTS follower_counts (username TEXT PRIMARY KEY, followers INTEGER NOT NULL)")
+    # 작성자별 글 목록 / 사용자별 타임라인: (시각, 글 id) 순으로 묶어 저장해 최근 N개를 인덱스 범위로 바로 읽음
+    conn.execute("CREATE TABLE IF NOT EXISTS author_posts (author TEXT NOT NULL, ts INTEGER NOT NULL, post_id TEXT NOT NULL, "
+                 "PRIMARY KEY (author, ts, post_id)) WITHOUT ROWID")
+    conn.execute("CREATE TABLE IF NOT EXISTS timelines (username TEXT NOT NULL, ts INTEGER NOT NULL, post_id TEXT NOT NULL, "
+                 "author TEXT NOT NULL, PRIMARY KEY (username, ts, post_id)) WITHOUT ROWID")
+
+
+# 기존 JSON 파일 → 테이블 (테이블별 1회)
+def _import_json_once(conn, table, json_file):
+    key = f"imported:{table}"
+    if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+        return
+    rows = []
+    if os.path.exists(json_file):
+        with open(json_file, 'r', encoding='utf-8') as f:
+            rows = [(username, json.dumps(record, ensure_ascii=False)) for username, record in json.load(f).items()]
+    with conn:
+        conn.execute("BEGIN")
+        conn.executemany(f"INSERT OR IGNORE INTO {table} (username, record) VALUES (?, ?)", rows)
+        conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, json_file))
+
+
+def _get(table, username, path=DB_FILE):
+    row = _connect(path).execute(f"SELECT record FROM {table} WHERE username = ?", (username,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def _put(table, username, record, path=DB_FILE):
+    _connect(path).execute(
+        f"INSERT INTO {table} (username, record) VALUES (?, ?) "
+        f"ON CONFLICT(username) DO UPDATE SET record = excluded.record",
+        (username, json.dumps(record, ensure_ascii=False)))
+
+def _iter(table, path=DB_FILE):
+    for username, record in _connect(path).execute(f"SELECT username, record FROM {table}"):
+        yield username, json.loads(record)
+
+
+# ----- 계정 -----
+def get_user(username): return _get("users", username)
+def put_user(username, record): _put("users", username, record)
+def iter_users(): return _iter("users")
+
+# 같은 이름으로 동시에 가입해도 한 명만 성공 (이미 있으면 False)
+def create_user(username, record):
+    cur = _connect().execute("INSERT OR IGNORE INTO users (username, record) VALUES (?, ?)",
+                             (username, json.dumps(record, ensure_ascii=False)))
+    return cur.rowcount == 1
+
+
+# ----- 관심 기업 -----
+def get_investment(username): return _get("investments", username)
+def iter_investments(): return _iter("investments")
+
+_investment_listeners = []
+
+# 같은 프로세스에서 관심 기업이 저장될 때마다 listener(username, record) 호출 (popularity.py)
+def subscribe_investments(listener):
+    _investment_listeners.append(listener)
+
+def put_investment(username, record):
+    _put("investments", username, record)
+    for listener in _investment_listeners:
+        listener(username, record)
+
+# 읽기-수정-쓰기를 한 트랜잭션으로: 저장된 최신 레코드에 update(record)를 적용 (배치 작업용)
+# update가 False를 돌려주면 저장하지 않음 → 저장했으면 True
+def update_investment(username, update):
+    conn = _connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT record FROM investments WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return False
+        record = json.loads(row[0])
+        if not update(record):
+            return False
+        conn.execute("UPDATE investments SET record = ? WHERE username = ?",
+                     (json.dumps(record, ensure_ascii=False), username))
+    for listener in _investment_listeners:
+        listener(username, record)
+    return True
+
+
+# ----- 팔로우 -----
+# 새로 팔로우했으면 True (팔로워 수도 같은 트랜잭션에서 갱신)
+def follow(follower, followee):
+    conn = _connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        added = conn.execute("INSERT OR IGNORE INTO follows (follower, followee) VALUES (?, ?)",
+                             (follower, followee)).rowcount == 1
+        if added:
+            conn.execute("INSERT INTO follower_counts (username, followers) VALUES (?, 1) "
+                         "ON CONFLICT(username) DO UPDATE SET followers = followers + 1", (followee,))
+    return added
+
+def unfollow(follower, followee):
+    conn = _connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        removed = conn.execute("DELETE FROM follows WHERE follower = ? AND followee = ?",
+                               (follower, followee)).rowcount == 1
+        if removed:
+            conn.execute("UPDATE follower_counts SET followers = followers - 1 WHERE username = ?", (followee,))
+    return removed
+
+def following(username):
+    return [r[0] for r in _connect().execute("SELECT followee FROM follows WHERE follower = ?", (username,))]
+
+def followers(username):
+    return [r[0] for r in _connect().execute("SELECT follower FROM follows WHERE followee = ?", (username,))]
+
+def follower_count(username):
+    row = _connect().execute("SELECT followers FROM follower_counts WHERE username = ?", (username,)).fetchone()
+    return row[0] if row else 0
+
+# username이 팔로우하는 사람 중 팔로워가 limit명을 넘는 사람
+def following_over(username, limit):
+    return [r[0] for r in _connect().execute(
+        "SELECT f.followee FROM follows f JOIN follower_counts c ON c.username = f.followee "
+        "WHERE f.follower = ? AND c.followers > ?", (username, limit))]
+
+
+# ----- 작성자별 글 / 타임라인 -----
+def add_author_posts(rows):   # [(author, ts, post_id), ...]
+    conn = _connect()
+    with conn:
+        conn.execute("BEGIN")
+        conn.executemany("INSERT OR IGNORE INTO author_posts (author, ts, post_id) VALUES (?, ?, ?)", rows)
+
+def author_post_count():
+    return _connect().execute("SELECT COUNT(*) FROM author_posts").fetchone()[0]
+
+def author_posts(author, limit):
+    return _connect().execute("SELECT ts, post_id FROM author_posts WHERE author = ? ORDER BY ts DESC, post_id DESC LIMIT ?",
+                              (author, limit)).fetchall()
+
+# 여러 사용자 타임라인에 글들을 넣고 사용자마다 최근 cap개만 남김 (한 트랜잭션)
+def timeline_add(usernames, entries, cap):   # entries = [(ts, post_id, author), ...]
+    conn = _connect()
+    with conn:
+        conn.execute("BEGIN")
+        for username in usernames:
+            conn.executemany("INSERT OR IGNORE INTO timelines (username, ts, post_id, author) VALUES (?, ?, ?, ?)",
+                             [(username, *entry) for entry in entries])
+            cutoff = conn.execute("SELECT ts, post_id FROM timelines WHERE username = ? "
+                                  "ORDER BY ts DESC, post_id DESC LIMIT 1 OFFSET ?", (username, cap)).fetchone()
+            if cutoff:
+                conn.execute("DELETE FROM timelines WHERE username = ? AND (ts, post_id) <= (?, ?)", (username, *cutoff))
+
+def timeline_remove_author(username, author):
+    _connect().execute("DELETE FROM timelines WHERE username = ? AND author = ?", (username, author))
+
+def clear_timelines():
+    _connect().execute("DELETE FROM timelines")
+
+def timeline(username, limit):
+    return _connect().execute("SELECT ts, post_id FROM timelines WHERE username = ? ORDER BY ts DESC, post_id DESC LIMIT ?",
+                              (username, limit)).fetchall()
+
+
+# WAL 내용을 DB 파일에 합치고 빈 공간 정리 → (정리 전, 후) 파일 크기
+def compact(path=DB_FILE):
+    conn = _connect(path)
+    before = os.path.getsize(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return before, os.path.getsize(path)
+
+def integrity_check(path=DB_FILE):
+    return [r[0] for r in _connect(path).execute("PRAGMA integrity_check")]
+
+
+# 전체 내용을 기존 JSON 형식으로 내보내기 (백업/호환용)
+def export_json(table, path):
+    data = dict(_iter(table))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)